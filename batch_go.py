@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: batch_go
+# Description: 一次推进很多盘棋的规则引擎（NumPy），规则跟 host.GO 一模一样，自对弈 / rollout 用；
+#              一个局面所有能下的点一次下完、一次算出估值特征（child_features）
+# TodoList:
+
+import numpy as np
+
+from evaluation import (ATARI_STONES, DEAD_FOURS, EYES, FEATURE_COUNT, LIVE_FOURS, LIVE_THREES, STONE_LIBERTIES,
+                        STONES, SWAPPED)
+from host import GO
+
+
+def _dilate(mask):
+    '''
+    每个棋盘的一步膨胀：返回 mask 里的点上下左右相邻的点
+    Shift boolean boards (..., n, n) one step in the four directions.
+    '''
+    out = np.zeros_like(mask)
+    out[..., 1:, :] |= mask[..., :-1, :]
+    out[..., :-1, :] |= mask[..., 1:, :]
+    out[..., :, 1:] |= mask[..., :, :-1]
+    out[..., :, :-1] |= mask[..., :, 1:]
+    return out
+
+
+def _alive(stones, empty):
+    '''
+    有气的子：从挨着空点的子开始，沿着同色的子往外传，直到所有棋盘都不再变化
+    Stones whose chain has a liberty, found by propagating liberty through same colored neighbors.
+
+    :param stones: boolean boards (..., n, n) of one color.
+    :param empty: boolean boards (..., n, n) of the empty points.
+    :return: boolean boards of the stones that have a liberty.
+    '''
+    alive = stones & _dilate(empty)
+    while True:
+        grown = stones & (alive | _dilate(alive))
+        if np.array_equal(grown, alive):
+            return alive
+        alive = grown
+
+
+def _neighbors(a, fill):
+    '''
+    每个点上下左右四个邻居的值，棋盘外是 fill
+    The values of the four neighbors of every point, fill off the board.
+
+    :param a: array (..., n, n).
+    :return: array (4, ..., n, n): the neighbor above, below, left and right.
+    '''
+    out = np.full((4,) + a.shape, fill, dtype=a.dtype)
+    out[0, ..., 1:, :] = a[..., :-1, :]
+    out[1, ..., :-1, :] = a[..., 1:, :]
+    out[2, ..., :, 1:] = a[..., :, :-1]
+    out[3, ..., :, :-1] = a[..., :, 1:]
+    return out
+
+
+def _chain_labels(boards):
+    '''
+    给每块棋编号：块里最小的点，空点是 n*n；同色的邻居互相传最小的编号，直到不再变化
+    Label every chain by its lowest point, propagating the minimum through same colored neighbors.
+
+    :param boards: int8 boards (..., n, n).
+    :return: labels (..., n, n), n * n on empty points.
+    '''
+    n = boards.shape[-1]
+    empty_label = n * n
+    labels = np.where(boards > 0, np.arange(n * n).reshape(n, n), empty_label)
+    same = (_neighbors(boards, 0) == boards) & (boards > 0)
+    while True:
+        around = np.where(same, _neighbors(labels, empty_label), empty_label).min(axis=0)
+        grown = np.minimum(labels, around)
+        if np.array_equal(grown, labels):
+            return labels
+        labels = grown
+
+
+def board_features(boards, piece_type):
+    '''
+    很多个棋盘一起算 evaluation.features 的特征向量
+    evaluation.features of a batch of boards at once.
+
+    :param boards: int8 boards (batch, n, n).
+    :param piece_type: 1('X') or 2('O'), the side the vectors are computed for.
+    :return: int array (batch, FEATURE_COUNT).
+    '''
+    batch, n = boards.shape[0], boards.shape[-1]
+    nn = n * n
+    labels = _chain_labels(boards)
+    empty = boards == 0
+    flat_labels = labels.reshape(batch, nn)
+    # Per board counts of every label (n * n is the empty label): bincount over board * (n * n + 1) + label
+    offsets = np.arange(batch)[:, None] * (nn + 1)
+
+    # An empty point is one liberty of every distinct chain around it
+    around = _neighbors(labels, nn)
+    for d in range(1, 4):
+        around[d] = np.where((around[d] == around[:d]).any(axis=0), nn, around[d])
+    liberty_of = np.where(empty, around, nn).transpose(1, 0, 2, 3).reshape(batch, 4 * nn)
+    liberties = np.bincount((liberty_of + offsets).ravel(), minlength=batch * (nn + 1)).reshape(batch, nn + 1)
+    # Stone-liberty contacts of every chain (pieces_with_one_liberty counts contacts, not points)
+    contacts = np.bincount((flat_labels + offsets).ravel(), _neighbors(empty, False).sum(axis=0).ravel(),
+                           batch * (nn + 1)).reshape(batch, nn + 1)
+    stone_liberties = np.take_along_axis(liberties, flat_labels, 1)
+    in_atari = (stone_liberties == 1) & (np.take_along_axis(contacts, flat_labels, 1) == 1)
+
+    vector = np.zeros((batch, FEATURE_COUNT), dtype=np.int32)
+    flat = boards.reshape(batch, nn)
+    for color in (1, 2):
+        side = color - 1
+        own = flat == color
+        vector[:, STONES + side] = own.sum(axis=1)
+        vector[:, STONE_LIBERTIES + side] = (stone_liberties * own).sum(axis=1)
+        vector[:, ATARI_STONES + side] = (in_atari & own).sum(axis=1)
+        # The edge counts as own for an eye
+        vector[:, EYES + side] = (empty & (_neighbors(boards, color) == color).all(axis=0)).sum(axis=(1, 2))
+        # Rows read from both edges, then columns read from both edges (the four LINES)
+        for lines in (boards, boards[:, :, ::-1], boards.transpose(0, 2, 1), boards.transpose(0, 2, 1)[:, :, ::-1]):
+            for j in range(n - 4):
+                window = lines[:, :, j:j + 4] == color
+                three = window[..., :3].all(axis=-1)
+                vector[:, LIVE_THREES + side] += three.sum(axis=1)
+                vector[:, LIVE_FOURS + side] += (three & window[..., 3]).sum(axis=1)
+                vector[:, DEAD_FOURS + side] += ((lines[:, :, j] == 3 - color)
+                                                 & window[..., 1:].all(axis=-1)).sum(axis=1)
+    if piece_type == 1:
+        return vector
+    return vector[:, list(SWAPPED)]
+
+
+def child_features(go, piece_type):
+    '''
+    一个局面 piece_type 所有能下的点一次下完，一次算出每个子局面的特征；估值就是特征矩阵乘权重
+    Play every legal move of piece_type in go at once and compute the features of every child.
+    Scores of all children are then one matrix product: features @ np.array(weights).
+
+    :param go: Go instance.
+    :param piece_type: 1('X') or 2('O').
+    :return: (points, boards, captured, features): the flat points i * n + j of the legal moves
+             (k,), the boards after them (k, n, n), the number of stones each captured (k,) and
+             the features of the children from the view of piece_type (k, FEATURE_COUNT).
+    '''
+    batch = BatchGO.from_games([go])
+    n = go.size
+    nn = n * n
+    boards = np.repeat(batch.boards, nn, axis=0)
+    previous_boards = np.broadcast_to(batch.previous_boards, boards.shape)
+    died = np.broadcast_to(batch.died_pieces.any(), (nn,))
+    pieces = np.full(nn, piece_type, dtype=np.int8)
+    valid, after, captured = batch._place(boards, pieces, np.arange(nn), previous_boards, died)
+    points = np.flatnonzero(valid)
+    children = after[points]
+    return points, children, captured[points].sum(axis=(1, 2)), board_features(children, piece_type)
+
+
+class BatchGO:
+    def __init__(self, batch, n=5):
+        '''
+        batch 盘 n*n 的棋，一起下
+        Go games played in lockstep. Every array has the batch as its first axis.
+
+        :param batch: number of boards.
+        :param n: size of the board n*n.
+        '''
+        self.batch = batch
+        self.size = n
+        self.max_move = n * n - 1
+        self.komi = n / 2
+        self.boards = np.zeros((batch, n, n), dtype=np.int8)
+        self.previous_boards = np.zeros((batch, n, n), dtype=np.int8)
+        self.died_pieces = np.zeros((batch, n, n), dtype=bool)  # stones captured by the last move
+        self.n_move = np.zeros(batch, dtype=np.int32)
+        self.both_passed = np.zeros(batch, dtype=bool)  # a PASS on an unchanged board ends the game
+
+    @classmethod
+    def from_games(cls, gos):
+        '''
+        把几个 GO 对象拼成一个 batch
+        Build a batch from GO instances of the same size.
+        '''
+        batch = cls(len(gos), gos[0].size)
+        for b, go in enumerate(gos):
+            batch.boards[b] = go.board
+            batch.previous_boards[b] = go.previous_board
+            for i, j in go.died_pieces:
+                batch.died_pieces[b, i, j] = True
+            batch.n_move[b] = go.n_move
+        return batch
+
+    def to_go(self, b):
+        '''
+        把第 b 盘棋拿出来变成一个 GO 对象
+        Copy board b into a GO instance.
+        '''
+        go = GO(self.size)
+        go.previous_board = self.previous_boards[b].tolist()
+        go.board = self.boards[b].tolist()
+        go.died_pieces = [tuple(point) for point in np.argwhere(self.died_pieces[b]).tolist()]
+        go.n_move = int(self.n_move[b])
+        return go
+
+    def _pieces(self, piece_type, shape):
+        '''
+        piece_type 可以是一个数，也可以每盘一个
+        Broadcast piece_type (scalar or one per board) to shape.
+        '''
+        return np.broadcast_to(np.asarray(piece_type, dtype=np.int8), shape)
+
+    def _place(self, boards, pieces, points, previous_boards, died):
+        '''
+        在每个棋盘的 points 上落 pieces 并提子，按 GO.valid_place_check 的规则判断能不能下
+        Place one stone per board and remove the dead opponent stones, following GO.valid_place_check.
+
+        :param boards: int8 boards (..., n, n).
+        :param pieces: piece type per board (...).
+        :param points: flat point index i * n + j per board (...).
+        :param previous_boards: the previous boards for the KO rule (..., n, n).
+        :param died: whether the last move of each board captured anything (...).
+        :return: (valid, boards after the move, captured stones) for every board.
+        '''
+        n = self.size
+        shape = boards.shape
+        index = points[..., None]
+        flat = boards.reshape(shape[:-2] + (n * n,))
+        current = np.take_along_axis(flat, index, -1)[..., 0]
+        empty_at = current == 0
+
+        placed = flat.copy()
+        np.put_along_axis(placed, index, np.where(empty_at, pieces, current)[..., None], -1)
+        placed = placed.reshape(shape)
+        own = pieces[..., None, None]
+        opp = 3 - own
+
+        # 下进去还有气，那随便下
+        empty = placed == 0
+        had_liberty = np.take_along_axis(
+            _alive(placed == own, empty).reshape(shape[:-2] + (n * n,)), index, -1)[..., 0]
+
+        # 提掉对手没气的子，再看这块棋有没有气，是不是打劫
+        opp_stones = placed == opp
+        captured = opp_stones & ~_alive(opp_stones, empty)
+        after = np.where(captured, 0, placed).astype(np.int8)
+        alive_after = np.take_along_axis(
+            _alive(after == own, after == 0).reshape(shape[:-2] + (n * n,)), index, -1)[..., 0]
+        repeat = (after == previous_boards).all(axis=(-2, -1))
+        valid = empty_at & (had_liberty | (alive_after & ~(died & repeat)))
+        return valid, after, captured
+
+    def legal_mask(self, piece_type):
+        '''
+        每盘棋里 piece_type 能下的点
+        Legal placements of every board.
+
+        :param piece_type: 1('X') or 2('O'), or an array with one piece type per board.
+        :return: boolean array (batch, n, n).
+        '''
+        n = self.size
+        nn = n * n
+        pieces = self._pieces(piece_type, (self.batch,))
+        # Every board is tried at every point: the candidates are a (batch, n * n) batch of boards
+        boards = np.repeat(self.boards[:, None], nn, axis=1)
+        previous_boards = np.broadcast_to(self.previous_boards[:, None], boards.shape)
+        died = np.broadcast_to(self.died_pieces.any(axis=(1, 2))[:, None], (self.batch, nn))
+        points = np.broadcast_to(np.arange(nn), (self.batch, nn))
+        candidate_pieces = np.broadcast_to(pieces[:, None], (self.batch, nn))
+        valid, _, _ = self._place(boards, candidate_pieces, points, previous_boards, died)
+        return valid.reshape(self.batch, n, n)
+
+    def play(self, moves, piece_type):
+        '''
+        每盘棋下一手：moves[b] = (row, column)，行是负数表示 PASS；不能下的棋盘不变
+        Make one move on every board. Boards whose move is invalid are left untouched,
+        like GO.place_chess returning False.
+
+        :param moves: int array (batch, 2) of (row, column), with a negative row for PASS.
+        :param piece_type: 1('X') or 2('O'), or an array with one piece type per board.
+        :return: boolean array (batch,) telling which moves (including passes) were played.
+        '''
+        n = self.size
+        moves = np.asarray(moves)
+        rows = moves[:, 0]
+        cols = moves[:, 1]
+        pieces = self._pieces(piece_type, (self.batch,))
+        is_pass = rows < 0
+        on_board = ~is_pass & (rows < n) & (cols >= 0) & (cols < n)
+        points = np.where(on_board, rows * n + cols, 0)
+
+        valid, after, captured = self._place(self.boards, pieces, points, self.previous_boards,
+                                             self.died_pieces.any(axis=(1, 2)))
+        valid &= on_board
+
+        moved = valid | is_pass
+        # Like host.judge: a PASS ends the game when the board did not change since the previous PASS
+        self.both_passed |= is_pass & (self.previous_boards == self.boards).all(axis=(1, 2))
+        self.previous_boards[moved] = self.boards[moved]
+        self.boards[valid] = after[valid]
+        self.died_pieces[valid] = captured[valid]
+        self.n_move[moved] += 1
+        return moved
+
+    def score(self, piece_type):
+        '''
+        每盘棋上 piece_type 有几个子
+        Stone count of piece_type on every board.
+        '''
+        pieces = self._pieces(piece_type, (self.batch,))
+        return (self.boards == pieces[:, None, None]).sum(axis=(1, 2))
+
+    def game_end(self):
+        '''
+        每盘棋是不是结束了：到了最大手数，或者上一手 PASS 且棋盘没变
+        Whether each game is over, as GO.game_end after the last action.
+        '''
+        return (self.n_move >= self.max_move) | self.both_passed
+
+    def judge_winner(self):
+        '''
+        每盘棋谁赢：1 / 2，平局 0
+        Winner of every board by stone count and komi (0 for a tie).
+        '''
+        cnt_1 = self.score(1)
+        cnt_2 = self.score(2) + self.komi
+        return np.where(cnt_1 > cnt_2, 1, np.where(cnt_1 < cnt_2, 2, 0))
@@ -0,0 +1,821 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: benchmark
+# Description: 离线测速、测命中率用的小工具：python benchmark.py <name>
+# TodoList:
+
+import argparse
+import random
+import time
+from copy import deepcopy
+
+from host import GO
+
+N = 5
+
+
+def standard_positions(count=40, seed=561, max_opening=12):
+    '''
+    固定种子生成的一组局面：随机下 0~max_opening 手，空棋盘和开局都在里面
+    The standard game set: positions reached by seeded random openings of 0 to max_opening moves.
+
+    :param count: number of positions.
+    :param seed: random seed, so every run sees the same positions.
+    :param max_opening: the longest random opening.
+    :return: a list of (piece_type, go) where piece_type is the side to move.
+    '''
+    rng = random.Random(seed)
+    positions = []
+    for k in range(count):
+        go = GO(N)
+        go.init_board(N)
+        piece_type = 1
+        for _ in range(k % (max_opening + 1)):
+            moves = go.legal_moves(piece_type)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            go.play(move.i, move.j, piece_type)
+            piece_type = 3 - piece_type
+        go.n_move = 0
+        positions.append((piece_type, go))
+    return positions
+
+
+def bench_symmetry(args):
+    '''
+    对称归一化前后置换表的命中率（每一局开一个新的 player，跟 build.sh 一样）
+    Transposition table hit rate with and without symmetry canonicalization.
+    '''
+    from my_player3 import MinMaxPlayer
+
+    for use_symmetry in (False, True):
+        probes = hits = 0
+        start = time.time()
+        for piece_type, go in standard_positions(args.positions):
+            player = MinMaxPlayer(time_limit=float('inf'), max_depth=3)
+            player.use_symmetry = use_symmetry
+            player.get_input(go, piece_type)
+            probes += player.transposition_table.probes
+            hits += player.transposition_table.hits
+        print('symmetry={}: probes {} hits {} hit rate {:.1%} time {:.2f}s'.format(
+            use_symmetry, probes, hits, hits / max(probes, 1), time.time() - start))
+
+
+class LegacyGOState:
+    '''
+    原来 GO 对象里的字段（两个二维数组棋盘 + died_pieces + 几个标志），用来测原来 deepcopy(go) 的开销
+    The attributes the list-of-lists GO carried, copied the way copy_board used to copy them.
+    '''
+
+    def __init__(self, go):
+        self.size = go.size
+        self.X_move = go.X_move
+        self.died_pieces = go.died_pieces
+        self.n_move = go.n_move
+        self.max_move = go.max_move
+        self.komi = go.komi
+        self.verbose = go.verbose
+        self.board = deepcopy(go.board)
+        self.previous_board = deepcopy(go.previous_board)
+
+
+class LegacyGO:
+    '''
+    原来 host.py 里二维数组的规则（拷贝过来，只去掉了打印），用来核对位棋盘的 GO
+    A copy of the list-of-lists rules of the original host.GO, without the verbose messages,
+    kept as the reference the bitboard GO is checked against.
+    '''
+
+    def __init__(self, n):
+        self.size = n
+        self.died_pieces = []
+        self.n_move = 0
+        self.max_move = n * n - 1
+        self.komi = n / 2
+
+    def init_board(self, n):
+        board = [[0 for x in range(n)] for y in range(n)]
+        self.board = board
+        self.previous_board = deepcopy(board)
+
+    def set_board(self, piece_type, previous_board, board):
+        for i in range(self.size):
+            for j in range(self.size):
+                if previous_board[i][j] == piece_type and board[i][j] != piece_type:
+                    self.died_pieces.append((i, j))
+        self.previous_board = previous_board
+        self.board = board
+
+    def ifTwoBoardSame(self, board1, board2):
+        for i in range(self.size):
+            for j in range(self.size):
+                if board1[i][j] != board2[i][j]:
+                    return False
+        return True
+
+    def copy_board(self):
+        return deepcopy(self)
+
+    def detect_neighbor(self, i, j):
+        board = self.board
+        neighbors = []
+        if i > 0: neighbors.append((i - 1, j))
+        if i < len(board) - 1: neighbors.append((i + 1, j))
+        if j > 0: neighbors.append((i, j - 1))
+        if j < len(board) - 1: neighbors.append((i, j + 1))
+        return neighbors
+
+    def detect_neighbor_ally(self, i, j):
+        board = self.board
+        neighbors = self.detect_neighbor(i, j)
+        group_allies = []
+        for piece in neighbors:
+            if board[piece[0]][piece[1]] == board[i][j]:
+                group_allies.append(piece)
+        return group_allies
+
+    def ally_dfs(self, i, j):
+        stack = [(i, j)]
+        ally_members = []
+        while stack:
+            piece = stack.pop()
+            ally_members.append(piece)
+            neighbor_allies = self.detect_neighbor_ally(piece[0], piece[1])
+            for ally in neighbor_allies:
+                if ally not in stack and ally not in ally_members:
+                    stack.append(ally)
+        return ally_members
+
+    def find_liberty(self, i, j):
+        board = self.board
+        ally_members = self.ally_dfs(i, j)
+        for member in ally_members:
+            neighbors = self.detect_neighbor(member[0], member[1])
+            for piece in neighbors:
+                if board[piece[0]][piece[1]] == 0:
+                    return True
+        return False
+
+    def find_died_pieces(self, piece_type):
+        board = self.board
+        died_pieces = []
+        for i in range(len(board)):
+            for j in range(len(board)):
+                if board[i][j] == piece_type:
+                    if not self.find_liberty(i, j):
+                        died_pieces.append((i, j))
+        return died_pieces
+
+    def remove_died_pieces(self, piece_type):
+        died_pieces = self.find_died_pieces(piece_type)
+        if not died_pieces: return []
+        self.remove_certain_pieces(died_pieces)
+        return died_pieces
+
+    def remove_certain_pieces(self, positions):
+        board = self.board
+        for piece in positions:
+            board[piece[0]][piece[1]] = 0
+        self.update_board(board)
+
+    def place_chess(self, i, j, piece_type):
+        board = self.board
+        valid_place = self.valid_place_check(i, j, piece_type)
+        if not valid_place:
+            return False
+        self.previous_board = deepcopy(board)
+        board[i][j] = piece_type
+        self.update_board(board)
+        return True
+
+    def valid_place_check(self, i, j, piece_type, test_check=False):
+        board = self.board
+        if not (i >= 0 and i < len(board)):
+            return False
+        if not (j >= 0 and j < len(board)):
+            return False
+        if board[i][j] != 0:
+            return False
+        test_go = self.copy_board()
+        test_board = test_go.board
+        test_board[i][j] = piece_type
+        test_go.update_board(test_board)
+        if test_go.find_liberty(i, j):
+            return True
+        test_go.remove_died_pieces(3 - piece_type)
+        if not test_go.find_liberty(i, j):
+            return False
+        else:
+            if self.died_pieces and self.ifTwoBoardSame(self.previous_board, test_go.board):
+                return False
+        return True
+
+    def update_board(self, new_board):
+        self.board = new_board
+
+    def score(self, piece_type):
+        board = self.board
+        cnt = 0
+        for i in range(self.size):
+            for j in range(self.size):
+                if board[i][j] == piece_type:
+                    cnt += 1
+        return cnt
+
+
+def bench_search(args):
+    '''
+    固定深度搜一遍标准局面：节点数、置换表命中、时间、排序花的时间
+    Nodes, transposition table hits, time and move ordering cost of a fixed-depth search over the standard game set.
+    '''
+    from my_player3 import MinMaxPlayer
+
+    nodes = probes = hits = quiescence_nodes = cache_hits = cache_misses = 0
+    ordering_time = 0.0
+    start = time.time()
+    for piece_type, go in standard_positions(args.positions):
+        player = MinMaxPlayer(time_limit=float('inf'), max_depth=args.depth)
+        player.get_input(go, piece_type)
+        nodes += player.nodes
+        probes += player.transposition_table.probes
+        hits += player.transposition_table.hits
+        ordering_time += player.ordering_time
+        quiescence_nodes += player.quiescence_nodes
+        cache_hits += player.evaluation_cache.hits
+        cache_misses += player.evaluation_cache.misses
+    print('depth {}: nodes {} quiescence nodes {} probes {} hits {} hit rate {:.1%} time {:.2f}s ordering {:.1f} us/node'.format(
+        args.depth, nodes, quiescence_nodes, probes, hits, hits / max(probes, 1), time.time() - start,
+        ordering_time / max(nodes, 1) * 1e6))
+    print('evaluation cache: hits {} misses {} hit rate {:.1%}'.format(
+        cache_hits, cache_misses, cache_hits / max(cache_hits + cache_misses, 1)))
+
+
+def bench_parallel(args):
+    '''
+    根节点并行搜索 1/2/4/8 个进程的加速比（固定深度）
+    Speedup of the root-parallel search with 1, 2, 4 and 8 processes at a fixed depth.
+    '''
+    import os
+    from my_player3 import MinMaxPlayer
+
+    print('cores: {}'.format(os.cpu_count()))
+    positions = standard_positions(args.positions)
+    serial_time = None
+    for workers in (1, 2, 4, 8):
+        nodes = 0
+        start = time.time()
+        for piece_type, go in positions:
+            player = MinMaxPlayer(time_limit=float('inf'), max_depth=args.depth)
+            # Measure the pool even on a machine where get_input would fall back to the serial search
+            player.workers = workers
+            player.get_input(go, piece_type)
+            nodes += player.nodes
+        elapsed = time.time() - start
+        if serial_time is None:
+            serial_time = elapsed
+        print('workers {}: nodes {} time {:.2f}s speedup {:.2f}x'.format(workers, nodes, elapsed, serial_time / elapsed))
+
+
+def bench_clone(args):
+    '''
+    GO.clone() 跟原来的 deepcopy(go) 比一比
+    Micro-benchmark of GO.clone() against the generic deepcopy of the old GO state.
+    '''
+    rounds = 2000
+    positions = standard_positions(args.positions)
+    legacy = {id(go): LegacyGOState(go) for _, go in positions}
+    cases = [
+        ('deepcopy(old GO state)', lambda go: deepcopy(legacy[id(go)])),
+        ('deepcopy(go)', deepcopy),
+        ('go.clone()', lambda go: go.clone()),
+        ('go.clone() + board view', lambda go: go.clone().board),
+    ]
+    for name, copy_go in cases:
+        start = time.time()
+        for _ in range(rounds // len(positions) + 1):
+            for _, go in positions:
+                copy_go(go)
+        elapsed = time.time() - start
+        copies = (rounds // len(positions) + 1) * len(positions)
+        print('{:<26} {:8.2f} us/copy'.format(name, elapsed / copies * 1e6))
+
+
+def legacy_shape(board, piece_type, eyes=True):
+    '''
+    原来的 evaluate_shape：每次新建棋形的 dict，每个点用两重循环对棋形、看是不是眼
+    The shape score the way evaluate_shape computed it before the compiled pattern tables.
+    The row shapes are only read left to right; eyes=False leaves the eyes out.
+    '''
+    opponent = 3 - piece_type
+    patterns = {
+        "live_four": ([[piece_type, piece_type, piece_type, piece_type, 0]], 3),
+        "dead_four": ([[opponent, piece_type, piece_type, piece_type, 0]], -1),
+        "live_three": ([[piece_type, piece_type, piece_type, 0, 0]], 2),
+    }
+    score = 0
+    for x in range(N):
+        for y in range(N):
+            if eyes and board[x][y] == 0 and all(board[x + dx][y + dy] == piece_type
+                                        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                                        if 0 <= x + dx < N and 0 <= y + dy < N):
+                score += 4
+            for pattern, pattern_score in patterns.values():
+                if x + len(pattern) > N or y + len(pattern[0]) > N:
+                    continue
+                if all(pattern[i][j] == 0 or pattern[i][j] == board[x + i][y + j]
+                       for i in range(len(pattern)) for j in range(len(pattern[0]))):
+                    score += pattern_score
+    return score
+
+
+def symmetric_shape(board, piece_type):
+    '''
+    用原来的扫描算现在的棋形分：行上的棋形在四个方向各读一遍（左右翻、转置、转置再翻）
+    The shape score of the four-direction line shapes from the old scan: the rows of the board,
+    of its mirror image and of both transposes.
+    '''
+    mirrored = [row[::-1] for row in board]
+    transposed = [list(column) for column in zip(*board)]
+    score = legacy_shape(board, piece_type)
+    for oriented in (mirrored, transposed, [row[::-1] for row in transposed]):
+        score += legacy_shape(oriented, piece_type, eyes=False)
+    return score
+
+
+def count_liberties(board, i, j, piece_type, visited=None):
+    '''
+    原来的递归数气：从 (i, j) 往外走，数碰到的空点（同一个空点碰几次算几次）
+    The recursive liberty count MinMaxPlayer used: empty points touched by the chain of (i, j),
+    counted once per contact.
+    '''
+    if visited is None:
+        visited = set()
+
+    if not is_valid_position(i, j) or (i, j) in visited:
+        return 0
+
+    if board[i][j] == 0:
+        return 1
+
+    if board[i][j] == 3 - piece_type:
+        return 0
+
+    visited.add((i, j))
+
+    neighbors = [(i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)]
+    return sum(count_liberties(board, x, y, piece_type, visited) for x, y in neighbors)
+
+
+def is_valid_position(i, j):
+    return 0 <= i < N and 0 <= j < N
+
+
+def get_chain_liberties(board, i, j, visited=None):
+    '''
+    (i, j) 所在的块的气（空点的集合）
+    The set of liberties of the chain of (i, j).
+    '''
+    if visited is None:
+        visited = set()
+
+    if (i, j) in visited or board[i][j] == 0:
+        return set()
+
+    visited.add((i, j))
+    piece_type = board[i][j]
+    liberties = set()
+
+    for x, y in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+        ni, nj = i + x, j + y
+        if 0 <= ni < N and 0 <= nj < N:
+            if board[ni][nj] == 0:
+                liberties.add((ni, nj))
+            elif board[ni][nj] == piece_type:
+                liberties |= get_chain_liberties(board, ni, nj, visited)
+
+    return liberties
+
+
+def total_chain_liberties(board, piece_type):
+    '''
+    原来的气的总数：visited 里记的是气而不是子，所以每个子都把自己那块的气加一遍
+    The old liberty total: visited holds liberties rather than stones, so every stone adds the
+    liberties of its chain.
+    '''
+    visited = set()
+    total_liberties = 0
+
+    for i in range(len(board)):
+        for j in range(len(board[0])):
+            if board[i][j] == piece_type and (i, j) not in visited:
+                chain_liberties = get_chain_liberties(board, i, j, set())
+                total_liberties += len(chain_liberties)
+                visited.update(chain_liberties)
+
+    return total_liberties
+
+
+def all_chain_liberties(board, piece_type):
+    visited = set()
+    chains_liberties = {}
+
+    for i in range(len(board)):
+        for j in range(len(board[0])):
+            if board[i][j] == piece_type and (i, j) not in visited:
+                chain_liberties = get_chain_liberties(board, i, j, set())
+                chains_liberties[(i, j)] = len(chain_liberties)
+                visited.update(chain_liberties)
+
+    return chains_liberties
+
+
+def pieces_with_one_liberty(board, piece_type):
+    '''
+    原来的叫吃子数：count_liberties 数出来是 1 的子
+    The old atari count: stones whose count_liberties is 1.
+    '''
+    visited = set()
+    count = 0
+
+    for i, row in enumerate(board):
+        for j, piece in enumerate(row):
+            position = (i, j)
+
+            if piece == piece_type and position not in visited:
+                if count_liberties(board, i, j, piece_type, set()) == 1:
+                    count += 1
+                    visited.add(position)
+
+    return count
+
+
+def legacy_evaluation(go, piece_type, captured_pieces_count):
+    '''
+    原来的多遍扫描：evaluate_board 和 move_bonus 各自扫棋盘、递归数气
+    The leaf score and move bonus the way they were computed before the evaluation kernel,
+    with one board scan (and recursive liberty counting) per term.
+    '''
+    opponent = 3 - piece_type
+    board = go.board
+    sign_modifier = 1 if piece_type == 1 else -1
+    leaf = (go.score(piece_type) - go.score(opponent) + sign_modifier * -2.5
+            + sign_modifier * symmetric_shape(board, piece_type))
+    factor = 8 if piece_type == 1 else 3
+    bonus = (factor * captured_pieces_count - 2 * pieces_with_one_liberty(board, piece_type)
+             + (total_chain_liberties(board, piece_type) - total_chain_liberties(board, opponent)) * 3
+             + go.score(piece_type) - go.score(opponent))
+    return leaf, bonus
+
+
+def bench_evaluation(args):
+    '''
+    单遍的估值（evaluation.features）跟原来多遍扫描的比：先核对每个局面分数一样，再比速度
+    The single-pass evaluation kernel against the multi-scan evaluation: check that both give
+    the same leaf score and move bonus on every child of the standard game set, then time them.
+    '''
+    from evaluation import (BONUS_WEIGHTS, MATERIAL_WEIGHTS, SHAPE_WEIGHTS, IncrementalEvaluator, features,
+                            weighted)
+    from my_player3 import MinMaxPlayer
+
+    def kernel(piece_type, go, captured):
+        # evaluate_board and move_bonus of MinMaxPlayer from one call of evaluation.features, without
+        # the player's EvaluationCache (the check below fills it, so the player would only time hits)
+        vector = features(go, piece_type)
+        sign_modifier = 1 if piece_type == 1 else -1
+        leaf = weighted(MATERIAL_WEIGHTS, vector) + sign_modifier * (-2.5 + weighted(SHAPE_WEIGHTS, vector))
+        factor = 8 if piece_type == 1 else 3
+        return leaf, factor * captured + weighted(BONUS_WEIGHTS, vector)
+
+    player = MinMaxPlayer(time_limit=float('inf'))
+    positions = []
+    for piece_type, go in standard_positions(args.positions):
+        for move in go.legal_moves(piece_type):
+            child = go.clone()
+            child.play(move.i, move.j, piece_type)
+            positions.append((piece_type, child, len(move.captured)))
+    for piece_type, go, captured in positions:
+        scores = (player.evaluate_board(go, 0, piece_type), player.move_bonus(go, piece_type, captured))
+        legacy = legacy_evaluation(go, piece_type, captured)
+        assert scores == legacy == kernel(piece_type, go, captured), (go.board, piece_type, scores, legacy)
+        for side in (1, 2):
+            assert player.evaluate_shape(go.board, side) == symmetric_shape(go.board, side), (go.board, side)
+    print('{} positions, same scores'.format(len(positions)))
+
+    rounds = 20
+    for name, shape in (('evaluate_shape before', symmetric_shape), ('evaluate_shape', player.evaluate_shape)):
+        start = time.time()
+        for _ in range(rounds):
+            for piece_type, go, _ in positions:
+                shape(go.board, piece_type)
+        elapsed = time.time() - start
+        print('{:<22} {:8.2f} us/position'.format(name, elapsed / (rounds * len(positions)) * 1e6))
+
+    cases = [
+        ('multi-scan', lambda piece_type, go, captured: legacy_evaluation(go, piece_type, captured)),
+        ('kernel', kernel),
+        ('cache hits', lambda piece_type, go, captured: (player.evaluate_board(go, 0, piece_type),
+                                                         player.move_bonus(go, piece_type, captured))),
+    ]
+    for name, evaluate in cases:
+        start = time.time()
+        for _ in range(rounds):
+            for piece_type, go, captured in positions:
+                evaluate(piece_type, go, captured)
+        elapsed = time.time() - start
+        print('{:<12} {:8.2f} us/position'.format(name, elapsed / (rounds * len(positions)) * 1e6))
+
+    # Features after every move of a make / unmake walk: from scratch against IncrementalEvaluator
+    evaluator = IncrementalEvaluator()
+    parents = [(piece_type, go, [(move.i, move.j) for move in go.legal_moves(piece_type)])
+               for piece_type, go in standard_positions(args.positions)]
+
+    def from_scratch(piece_type, go, moves):
+        for i, j in moves:
+            record = go.play(i, j, piece_type)
+            features(go, piece_type)
+            go.undo(record)
+
+    def incremental(piece_type, go, moves):
+        evaluator.reset(go)
+        for i, j in moves:
+            record = evaluator.play(go, i, j, piece_type)
+            evaluator.features(piece_type)
+            evaluator.undo(go, record)
+
+    for name, walk in (('from scratch', from_scratch), ('incremental', incremental)):
+        start = time.time()
+        for _ in range(rounds):
+            for piece_type, go, moves in parents:
+                walk(piece_type, go, moves)
+        elapsed = time.time() - start
+        print('{:<12} {:8.2f} us/move (play + features + undo)'.format(name, elapsed / (rounds * len(positions)) * 1e6))
+
+
+def bench_batch(args):
+    '''
+    BatchGO 跟一样的几盘 GO 一起下（随机落子，带 PASS）：每一步比能下的点、棋盘、上一手的棋盘、
+    打劫用的死子、手数、终局和胜负
+    Lockstep check of BatchGO against the same games on GO: every position of the standard game
+    set is continued with seeded random moves and passes on both. At every step the legal masks,
+    boards, previous boards, the stones of the last capture (KO), move counts, game_end, scores and
+    winners must agree, and BatchGO.to_go must give back the same legal moves.
+    '''
+    import numpy as np
+    from batch_go import BatchGO
+
+    rng = random.Random(561)
+    positions = standard_positions(args.positions, max_opening=20)
+    gos = [go for _, go in positions]
+    pieces = np.array([piece_type for piece_type, _ in positions], dtype=np.int8)
+    batch = BatchGO.from_games(gos)
+    ended = np.zeros(len(gos), dtype=bool)
+    steps = passes = 0
+    start = time.time()
+    while not ended.all():
+        mask = batch.legal_mask(pieces)
+        moves = np.full((len(gos), 2), N, dtype=np.int64)  # off the board: an ended game is left as it is
+        expected_end = ended.copy()
+        for b, go in enumerate(gos):
+            if ended[b]:
+                continue
+            legal_moves = go.legal_moves(int(pieces[b]))
+            expected = np.zeros((N, N), dtype=bool)
+            for move in legal_moves:
+                expected[move.i, move.j] = True
+            assert (mask[b] == expected).all(), (go.board, pieces[b])
+            if not legal_moves or rng.random() < 0.1:
+                moves[b] = (-1, -1)
+                expected_end[b] = go.board == go.previous_board
+                go.play_pass()
+                passes += 1
+            else:
+                move = rng.choice(legal_moves)
+                moves[b] = (move.i, move.j)
+                go.play(move.i, move.j, int(pieces[b]))
+                steps += 1
+            expected_end[b] |= go.n_move >= go.max_move
+        moved = batch.play(moves, pieces)
+        assert (moved == ~ended).all()
+        for b, go in enumerate(gos):
+            assert batch.boards[b].tolist() == go.board and batch.previous_boards[b].tolist() == go.previous_board
+            assert sorted(map(tuple, np.argwhere(batch.died_pieces[b]).tolist())) == sorted(go.died_pieces)
+            assert batch.n_move[b] == go.n_move
+            rebuilt = batch.to_go(b)
+            assert rebuilt.legal_moves(3 - int(pieces[b])) == go.legal_moves(3 - int(pieces[b]))
+        assert (batch.game_end() == expected_end).all()
+        for color in (1, 2):
+            assert batch.score(color).tolist() == [go.score(color) for go in gos]
+        assert batch.judge_winner().tolist() == [go.judge_winner() for go in gos]
+        pieces = np.where(moved, 3 - pieces, pieces).astype(np.int8)
+        ended = expected_end
+    print('{} games, {} moves, {} passes: same boards, legal moves, KO state and scores ({:.2f}s)'.format(
+        len(gos), steps, passes, time.time() - start))
+
+
+def bench_children(args):
+    '''
+    一个局面所有子局面的 move_bonus：一个一个下（从头算 / 增量）跟 NumPy 一次算完比
+    Score every child of a position with move_bonus: one child at a time (features from scratch,
+    or incremental) against all children at once with NumPy and one matrix product.
+    '''
+    import numpy as np
+    from batch_go import child_features
+    from evaluation import BONUS_WEIGHTS, IncrementalEvaluator, features, weighted
+
+    rounds = 5
+    positions = standard_positions(args.positions)
+    weights = np.array(BONUS_WEIGHTS)
+    evaluator = IncrementalEvaluator()
+
+    def from_scratch(piece_type, go):
+        scores = []
+        for move in go.legal_moves(piece_type):
+            child = go.clone()
+            child.play(move.i, move.j, piece_type)
+            scores.append(weighted(BONUS_WEIGHTS, features(child, piece_type)))
+        return scores
+
+    def incremental(piece_type, go):
+        scores = []
+        evaluator.reset(go)
+        for move in go.legal_moves(piece_type):
+            record = evaluator.play(go, move.i, move.j, piece_type)
+            scores.append(weighted(BONUS_WEIGHTS, evaluator.features(piece_type)))
+            evaluator.undo(go, record)
+        return scores
+
+    def vectorized(piece_type, go):
+        return (child_features(go, piece_type)[3] @ weights).tolist()
+
+    for piece_type, go in positions:
+        assert from_scratch(piece_type, go) == incremental(piece_type, go) == vectorized(piece_type, go)
+    for name, score_children in (('from scratch', from_scratch), ('incremental', incremental),
+                                 ('numpy', vectorized)):
+        start = time.time()
+        for _ in range(rounds):
+            for piece_type, go in positions:
+                score_children(piece_type, go)
+        elapsed = time.time() - start
+        print('{:<14} {:8.1f} us/position'.format(name, elapsed / (rounds * len(positions)) * 1e6))
+
+    # The same features for the children of every position in one call: the NumPy overhead is paid once
+    from batch_go import board_features
+    children = [(piece_type, child_features(go, piece_type)[1]) for piece_type, go in positions]
+    black = np.concatenate([boards for piece_type, boards in children if piece_type == 1])
+    white = np.concatenate([boards for piece_type, boards in children if piece_type == 2])
+    start = time.time()
+    for _ in range(rounds):
+        board_features(black, 1) @ weights
+        board_features(white, 2) @ weights
+    elapsed = time.time() - start
+    print('{:<14} {:8.1f} us/position (features of {} children in two calls)'.format(
+        'numpy batched', elapsed / (rounds * len(positions)) * 1e6, len(black) + len(white)))
+
+
+def bench_playout(args):
+    '''
+    mcts_player 里 playout 用的 _Position 跟 GO 对一遍：从标准局面接着随机下到终局（带 PASS），
+    每一手比能下的点、提几个子、落子和 PASS 以后的棋盘、上一手的棋盘和打劫的状态
+    Check the light playout position of mcts_player against GO: from every position of the
+    standard game set, a seeded random game with passes runs on both. At every move the legal
+    points and captures of _Position.place must be those of GO.legal_moves, and the boards,
+    previous boards and KO state after place / play_pass those after GO.play / play_pass, also
+    when the position is rebuilt from the GO with _Position.from_go.
+    '''
+    from mcts_player import _Position
+
+    rng = random.Random(561)
+    moves_played = passes = captures = 0
+    start = time.time()
+    for piece_type, go in standard_positions(args.positions, max_opening=20):
+        position = _Position.from_go(go)
+        while go.n_move < go.max_move and position.passes < 2:
+            legal_moves = go.legal_moves(piece_type)
+            expected = {move.i * N + move.j: len(move.captured) for move in legal_moves}
+            found = {}
+            for p in range(N * N):
+                if not (position.stones[1] | position.stones[2]) >> p & 1:
+                    captured = position.copy().place(p, piece_type)
+                    if captured >= 0:
+                        found[p] = captured
+            assert found == expected, (go.board, piece_type, found, expected)
+
+            if not legal_moves or rng.random() < 0.1:
+                position.play_pass()
+                go.play_pass()
+                passes += 1
+            else:
+                move = rng.choice(legal_moves)
+                assert position.place(move.i * N + move.j, piece_type) == len(move.captured)
+                go.play(move.i, move.j, piece_type)
+                captures += len(move.captured)
+                moves_played += 1
+            piece_type = 3 - piece_type
+            rebuilt = _Position.from_go(go)
+            assert position.stones == rebuilt.stones and position.previous == rebuilt.previous, go.board
+            assert position.died == rebuilt.died and position.n_move == go.n_move
+    print('{} games, {} moves, {} passes, {} stones captured: same rules ({:.2f}s)'.format(
+        args.positions, moves_played, passes, captures, time.time() - start))
+
+
+def bench_rules(args):
+    '''
+    位棋盘的 GO 跟原来二维数组的规则（LegacyGO）对一遍：固定种子的随机对局里每一手都比能下的点、
+    每个点会提的子和下完的气、落子提子以后的棋盘，play/undo 要退回原样，PASS 和 set_board 重新摆一遍也要一样
+    Check the bitboard GO against the list-of-lists rules of LegacyGO over seeded random games
+    with passes. At every move: the legal points of valid_place_check and legal_moves, the stones
+    every move captures and the liberties it leaves, the boards after place_chess +
+    remove_died_pieces and after play, the position restored by undo, and a GO rebuilt with
+    set_board from the previous and current boards.
+    '''
+    rng = random.Random(561)
+    points = [(i, j) for i in range(N) for j in range(N)]
+    moves_played = passes = captures = 0
+    start = time.time()
+    for _ in range(args.positions):
+        go = GO(N)
+        go.init_board(N)
+        legacy = LegacyGO(N)
+        legacy.init_board(N)
+        piece_type = 1
+        passed = False
+        for n_move in range(go.max_move):
+            expected = [(i, j) for i, j in points if legacy.valid_place_check(i, j, piece_type, test_check=True)]
+            assert [(i, j) for i, j in points if go.valid_place_check(i, j, piece_type, test_check=True)] == expected
+            legal_moves = go.legal_moves(piece_type)
+            assert [(move.i, move.j) for move in legal_moves] == expected, (legacy.board, piece_type)
+
+            key = go.zobrist_key(piece_type)
+            for move in legal_moves:
+                child = legacy.copy_board()
+                child.place_chess(move.i, move.j, piece_type)
+                died = child.remove_died_pieces(3 - piece_type)
+                assert sorted(move.captured) == sorted(died), (legacy.board, move)
+                liberties = {point for member in child.ally_dfs(move.i, move.j)
+                             for point in child.detect_neighbor(*member) if child.board[point[0]][point[1]] == 0}
+                assert move.liberties == len(liberties), (legacy.board, move)
+                record = go.play(move.i, move.j, piece_type)
+                assert go.board == child.board and go.previous_board == child.previous_board
+                assert sorted(go.died_pieces) == sorted(died)
+                go.undo(record)
+                assert go.board == legacy.board and go.previous_board == legacy.previous_board
+                assert sorted(go.died_pieces) == sorted(legacy.died_pieces) and go.zobrist_key(piece_type) == key
+
+            # The host's turn: place_chess + remove_died_pieces, or a PASS that copies the board
+            if not legal_moves or rng.random() < 0.1:
+                legacy.previous_board = deepcopy(legacy.board)
+                go.previous_board = deepcopy(go.board)
+                passes += 1
+                if passed:
+                    break
+                passed = True
+            else:
+                move = rng.choice(legal_moves)
+                assert legacy.place_chess(move.i, move.j, piece_type) and go.place_chess(move.i, move.j, piece_type)
+                legacy.died_pieces = legacy.remove_died_pieces(3 - piece_type)
+                go.died_pieces = go.remove_died_pieces(3 - piece_type)
+                captures += len(legacy.died_pieces)
+                moves_played += 1
+                passed = False
+            piece_type = 3 - piece_type
+            assert go.board == legacy.board and go.previous_board == legacy.previous_board
+            assert sorted(go.died_pieces) == sorted(legacy.died_pieces)
+            for color in (1, 2):
+                assert go.score(color) == legacy.score(color)
+
+            # Round trip through the input file: both rebuilt from the two boards with set_board
+            rebuilt = GO(N)
+            rebuilt.init_board(N)
+            rebuilt.set_board(piece_type, deepcopy(go.previous_board), deepcopy(go.board))
+            legacy_rebuilt = LegacyGO(N)
+            legacy_rebuilt.init_board(N)
+            legacy_rebuilt.set_board(piece_type, deepcopy(legacy.previous_board), deepcopy(legacy.board))
+            assert rebuilt.board == legacy_rebuilt.board and rebuilt.died_pieces == legacy_rebuilt.died_pieces
+            assert ([(move.i, move.j) for move in rebuilt.legal_moves(piece_type)]
+                    == [(i, j) for i, j in points if legacy_rebuilt.valid_place_check(i, j, piece_type)])
+    print('{} games, {} moves, {} passes, {} stones captured: same rules ({:.2f}s)'.format(
+        args.positions, moves_played, passes, captures, time.time() - start))
+
+
+BENCHMARKS = {
+    'batch': bench_batch,
+    'children': bench_children,
+    'clone': bench_clone,
+    'evaluation': bench_evaluation,
+    'parallel': bench_parallel,
+    'playout': bench_playout,
+    'rules': bench_rules,
+    'search': bench_search,
+    'symmetry': bench_symmetry,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("name", choices=sorted(BENCHMARKS), help="benchmark to run")
+    parser.add_argument("--positions", "-p", type=int, help="number of positions of the standard game set", default=40)
+    parser.add_argument("--depth", "-d", type=int, help="search depth of the search benchmark", default=4)
+    args = parser.parse_args()
+
+    BENCHMARKS[args.name](args)
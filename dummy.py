@@ -12,24 +12,8 @@ class MinMaxPlayer:
                            [0, 0], [0, 1], [2, 3], [0, 3], [0, 4], [1, 4], [2, 1], [3, 4], [4, 4],
                            [4, 3], [1, 0], [4, 1], [4, 0], [3, 0], [1, 2], [3, 2]]
         self.transposition_table = {}
-        self.zobrist_table = self.init_zobrist()
     def opponent(self, piece_type):
         return 3 - piece_type
-    def init_zobrist(self):
-        import random
-        table = {}
-        for i in range(5):
-            for j in range(5):
-                for k in [1, 2]:
-                    table[(i, j, k)] = random.getrandbits(64)
-        return table
-    def compute_hash(self, board):
-        h = 0
-        for i in range(5):
-            for j in range(5):
-                if board[i][j] != 0:
-                    h ^= self.zobrist_table[(i, j, board[i][j])]
-        return h
     def heuristic_move_order(self, go, piece_type):
         moves_heuristic = {}
 
@@ -235,7 +219,7 @@ class MinMaxPlayer:
         return adj_chains > 1
 
     def min_max_ab_pruning(self, go, cur_player, piece_type, alpha, beta, depth):
-        board_hash = self.compute_hash(go.board)
+        board_hash = go.zobrist_key(piece_type)
         if board_hash in self.transposition_table:
             stored_value, stored_depth = self.transposition_table[board_hash]
             if stored_depth >= depth:
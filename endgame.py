@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: endgame
+# Description: 残局精确求解：剩下的手数或空点少的时候，一直搜到终局，按数子 + 贴目算输赢
+# TodoList:
+
+import time
+
+from move_clock import estimate_move_index
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class SolverTimeout(Exception):
+    '''
+    求解的时间用完了
+    Raised when the solver runs past its deadline.
+    '''
+
+
+class EndgameSolver:
+    def __init__(self, max_entries=1 << 20):
+        '''
+        残局求解器，有自己的结果缓存（满了就清空）
+        Exact win/draw/loss solver of the end of the game, with its own result cache.
+
+        :param max_entries: the cache is cleared when it grows past this many positions.
+        '''
+        self.cache = {}
+        self.max_entries = max_entries
+        self.deadline = None
+        self.nodes = 0
+
+    def result(self, go, piece_type):
+        '''
+        终局的输赢：黑子数跟白子数 + 贴目比
+        Final result for piece_type by stone count against komi.
+        '''
+        black = go.score(1)
+        white = go.score(2) + go.komi
+        if black == white:
+            return DRAW
+        return WIN if (black > white) == (piece_type == 1) else LOSS
+
+    def solve(self, go, piece_type, passes=0, time_limit=None):
+        '''
+        一直搜到终局（到了 max_move，或者连着两个 PASS）
+        Solve the game from go with piece_type to move.
+
+        :param go: Go instance; n_move must count the moves played so far (see move_index).
+        :param piece_type: 1('X') or 2('O').
+        :param passes: consecutive passes just played (1 if the opponent just passed).
+        :param time_limit: seconds; SolverTimeout is raised past it.
+        :return: (move, result) where move is (row, column) or "PASS" and result is WIN, DRAW or LOSS.
+        '''
+        self.deadline = None if time_limit is None else time.time() + time_limit
+        self.nodes = 0
+        if len(self.cache) > self.max_entries:
+            self.cache.clear()
+        try:
+            return self._negamax(go, piece_type, passes, LOSS, WIN)
+        finally:
+            self.deadline = None
+
+    def _moves(self, go, piece_type):
+        # Captures first, then the moves that leave the most liberties; PASS last
+        moves = go.legal_moves(piece_type)
+        moves.sort(key=lambda move: (len(move.captured), move.liberties), reverse=True)
+        return [(move.i, move.j) for move in moves] + ["PASS"]
+
+    def _negamax(self, go, piece_type, passes, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and time.time() >= self.deadline:
+            raise SolverTimeout()
+        if go.n_move >= go.max_move or passes >= 2:
+            return None, self.result(go, piece_type)
+
+        key = (go.zobrist_key(piece_type), go.n_move, passes)
+        alpha_orig, beta_orig = alpha, beta
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, flag, move = entry
+            if flag == EXACT:
+                return move, value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return move, value
+
+        best_move = None
+        best_value = LOSS - 1
+        for move in self._moves(go, piece_type):
+            if move == "PASS":
+                record = go.play_pass()
+                _, value = self._negamax(go, 3 - piece_type, passes + 1, -beta, -alpha)
+            else:
+                record = go.play(move[0], move[1], piece_type)
+                _, value = self._negamax(go, 3 - piece_type, 0, -beta, -alpha)
+            go.undo(record)
+            value = -value
+            if value > best_value:
+                best_move, best_value = move, value
+                alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.cache[key] = (best_value, flag, best_move)
+        return best_move, best_value
+
+
+def opponent_passed(go):
+    '''
+    棋盘跟上一手一样、而且不是空棋盘：对手刚 PASS 了
+    Whether the last action was a PASS: the board did not change and is not empty.
+    '''
+    return go.board == go.previous_board and any(any(row) for row in go.board)
+
+
+def empty_count(go):
+    return go.size * go.size - go.score(1) - go.score(2)
+
+
+def move_index(go, piece_type):
+    '''
+    第几手：MoveClock 设过 go.n_move 就用它，没设（还是 0）的话按棋盘上的子数估，取大的
+    The move index of go: go.n_move when a MoveClock set it, and never less than the estimate
+    from the stones on the board, so an unset n_move does not let the game run past max_move.
+    '''
+    return max(go.n_move, estimate_move_index(go, piece_type))
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: evaluation
+# Description: 一遍算完的估值：用 GO 增量记好的块，一次得到子数、每块的气、叫吃的子，眼和行、列上的棋形查编译好的表（patterns.py），
+#              组成特征向量，分数是特征向量跟权重的点积；搜索里用 IncrementalEvaluator 跟着落子/悔棋只改动到的地方
+# TodoList:
+
+from array import array
+from operator import mul
+
+from host import board_geometry, popcount
+from patterns import CROSS, LINES, PatternBoard, PatternTable
+
+# Every feature is a pair: index + 0 for the side the vector is computed for, index + 1 for its opponent
+STONES = 0  # stones on the board
+STONE_LIBERTIES = 2  # sum over the stones of the liberties of their chain (total_chain_liberties)
+ATARI_STONES = 4  # stones of chains touching their only liberty once (pieces_with_one_liberty)
+EYES = 6  # empty points whose neighbors are all own stones (is_eye_shape)
+LIVE_FOURS = 8  # four own stones from an edge along a row or column (the "live_four" shape)
+DEAD_FOURS = 10  # an opponent stone then three own stones from an edge along a row or column ("dead_four")
+LIVE_THREES = 12  # three own stones from an edge along a row or column ("live_three")
+FEATURE_COUNT = 14
+FEATURE_NAMES = tuple('{}_{}'.format(name, side) for name in (
+    'stones', 'stone_liberties', 'atari_stones', 'eyes', 'live_fours', 'dead_fours', 'live_threes')
+    for side in ('own', 'opponent'))
+
+# Weights of the leaf evaluation: the stone difference, and the shape score that evaluate_board signs by color
+MATERIAL_WEIGHTS = (1, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+SHAPE_WEIGHTS = (0, 0, 0, 0, 0, 0, 4, 0, 3, 0, -1, 0, 2, 0)
+# Weights of the bonus of the side that just moved (move_bonus, without the capture term)
+BONUS_WEIGHTS = (1, -1, 3, -3, -2, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+# The vector of the other side: every own/opponent pair swapped
+SWAPPED = tuple(k ^ 1 for k in range(FEATURE_COUNT))
+
+# Shapes, compiled to lookup tables per board size; the counts of a PatternBoard of EYE_PATTERNS fill
+# EYES, the counts of ROW_PATTERNS summed over the four LINES fill LIVE_FOURS, DEAD_FOURS and LIVE_THREES,
+# black then white. The old row shapes were only read left to right, so a position and its mirror image
+# scored differently and could not share a canonical transposition entry; the four directions make every
+# feature invariant under the board symmetries
+EYE_PATTERNS = ('.xxxx',)  # over CROSS: an empty point whose neighbors on the board are all own (is_eye_shape)
+ROW_PATTERNS = ('XXXX?', 'OXXX?', 'XXX??')  # over LINES: live four, dead four, live three, all on the board
+_TABLES = {}
+
+
+def pattern_tables(n):
+    '''
+    每种棋盘大小只编译一次
+    (eye table, line tables) of an n*n board, compiled once; one line table per direction of LINES.
+    '''
+    tables = _TABLES.get(n)
+    if tables is None:
+        tables = (PatternTable(CROSS, EYE_PATTERNS, n), tuple(PatternTable(line, ROW_PATTERNS, n) for line in LINES))
+        _TABLES[n] = tables
+    return tables
+
+
+def _line_counts(boards):
+    '''
+    四个方向的棋形个数加起来
+    Counts of ROW_PATTERNS summed over the PatternBoards of the four lines.
+    '''
+    return [sum(counts) for counts in zip(*(board.counts for board in boards))]
+
+
+def _chain_terms(stones, libs, neighbors):
+    '''
+    一块棋对 STONE_LIBERTIES 和 ATARI_STONES 的贡献
+    (stone liberties, atari stones) of one chain.
+    '''
+    size = popcount(stones)
+    liberties = popcount(libs)
+    # pieces_with_one_liberty counts stone-liberty contacts, so a chain touching its last liberty twice is not in atari
+    if liberties == 1 and popcount(neighbors[libs.bit_length() - 1] & stones) == 1:
+        return size * liberties, size
+    return size * liberties, 0
+
+
+def shape_features(black, white, n):
+    '''
+    只有棋形的特征（黑棋的角度），每个点查一次表
+    The eye and line shape features of a board from the view of black, the other features left at 0.
+
+    :param black: bitboard of the black stones.
+    :param white: bitboard of the white stones.
+    :param n: width and height of the board.
+    '''
+    eye_table, line_tables = pattern_tables(n)
+    vector = [0] * FEATURE_COUNT
+    vector[EYES:EYES + 2] = PatternBoard(eye_table, black, white).counts
+    vector[LIVE_FOURS:LIVE_THREES + 2] = _line_counts([PatternBoard(table, black, white) for table in line_tables])
+    return vector
+
+
+def features(go, piece_type):
+    '''
+    一遍算出 piece_type 角度的特征向量：块只看 GO 记好的编号，眼和线上的棋形每个点查一次编译好的表
+    Evaluation features of the position from the view of piece_type, in one pass over the chains
+    GO keeps labelled; eyes and line shapes are one table lookup per point and direction.
+
+    :param go: Go instance.
+    :param piece_type: 1('X') or 2('O').
+    :return: a list of FEATURE_COUNT integers, own value then opponent value of every feature.
+    '''
+    neighbors = board_geometry(go.size)[1]
+    chains = (None, go.chains(1), go.chains(2))
+    masks = [0, 0, 0]
+    for color in (1, 2):
+        for stones, _ in chains[color]:
+            masks[color] |= stones
+    vector = shape_features(masks[1], masks[2], go.size)
+    for color in (1, 2):
+        for stones, libs in chains[color]:
+            liberties, atari = _chain_terms(stones, libs, neighbors)
+            vector[STONE_LIBERTIES + color - 1] += liberties
+            vector[ATARI_STONES + color - 1] += atari
+        vector[STONES + color - 1] = popcount(masks[color])
+    if piece_type == 1:
+        return vector
+    return [vector[k] for k in SWAPPED]
+
+
+def weighted(weights, vector):
+    '''
+    特征向量跟权重的点积
+    Dot product of a weight vector and a feature vector.
+    '''
+    return sum(map(mul, weights, vector))
+
+
+class EvaluationCache:
+    def __init__(self, capacity=1 << 16):
+        '''
+        定长的估值缓存：key 是 Zobrist 值（里面有轮到谁下），存轮到下的一方角度的特征向量；
+        满了用 clock 算法淘汰（转一圈，最近查到过的留一次）
+        Bounded cache of feature vectors keyed by GO.zobrist_key(side to move), storing the vector
+        from the view of the side to move. When full, the clock algorithm evicts an entry that has
+        not been hit since the hand last passed it.
+
+        :param capacity: the most entries kept.
+        '''
+        self.capacity = capacity
+        self.slots = {}  # key -> slot
+        self.keys = array('Q', bytes(8 * capacity))
+        self.values = [None] * capacity
+        self.referenced = bytearray(capacity)
+        self.hand = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def get(self, key):
+        '''
+        查缓存
+        The cached vector of key, or None.
+        '''
+        slot = self.slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.referenced[slot] = 1
+        return self.values[slot]
+
+    def put(self, key, vector):
+        slot = self.slots.get(key)
+        if slot is None:
+            if len(self.slots) < self.capacity:
+                slot = len(self.slots)
+            else:
+                referenced = self.referenced
+                hand = self.hand
+                while referenced[hand]:
+                    referenced[hand] = 0
+                    hand = (hand + 1) % self.capacity
+                slot = hand
+                self.hand = (hand + 1) % self.capacity
+                del self.slots[self.keys[slot]]
+                self.evictions += 1
+            self.slots[key] = slot
+            self.keys[slot] = key
+            self.referenced[slot] = 0
+        self.values[slot] = vector
+
+
+def cached_features(go, piece_type, cache):
+    '''
+    先查缓存，没有再从头算
+    features(go, piece_type) through cache.
+    '''
+    key = go.zobrist_key(piece_type)
+    vector = cache.get(key)
+    if vector is None:
+        vector = features(go, piece_type)
+        cache.put(key, vector)
+    return vector
+
+
+class IncrementalEvaluator:
+    def __init__(self, cache=None):
+        '''
+        跟着搜索的落子/悔棋增量更新的特征向量：一手棋只重算这一手和被提的子旁边的块，棋形表只改碰到这些点的窗口，
+        悔棋的时候弹出上一个向量，窗口编码改回去
+        Feature vector kept up to date through the moves of a search. A move only recomputes the
+        chains next to the played point and the captured stones and the pattern windows covering
+        those points; undo pops the previous vector and reverts the windows.
+        Moves must go through play / play_pass / undo of the evaluator for the go it was reset on.
+
+        :param cache: an EvaluationCache; a position found there skips the chain update.
+        '''
+        self.cache = cache
+        self.go = None
+        self.vector = None  # features() from the view of black: index + 0 black, index + 1 white
+        self.eyes = None  # PatternBoard of EYE_PATTERNS
+        self.lines = None  # PatternBoards of ROW_PATTERNS, one per direction of LINES
+        self.stack = []
+
+    def reset(self, go):
+        '''
+        从头算一遍 go 的特征，以后 go 的落子都要走这个对象
+        Compute the features of go from scratch and follow go from now on.
+        '''
+        self.go = go
+        self.vector = features(go, 1)
+        masks = [0, 0, 0]
+        for piece_type in (1, 2):
+            for stones, _ in go.chains(piece_type):
+                masks[piece_type] |= stones
+        eye_table, line_tables = pattern_tables(go.size)
+        self.eyes = PatternBoard(eye_table, masks[1], masks[2])
+        self.lines = [PatternBoard(table, masks[1], masks[2]) for table in line_tables]
+        self.stack = []
+
+    def features(self, piece_type):
+        '''
+        现在的局面 piece_type 角度的特征向量，跟 features(go, piece_type) 一样
+        The current features from the view of piece_type, the same as features(go, piece_type).
+        '''
+        if piece_type == 1:
+            return self.vector
+        vector = self.vector
+        return [vector[k] for k in SWAPPED]
+
+    def _change(self, p, piece_type, captured, place):
+        # Put the stone on p and take the captured stones off, or the other way round
+        opponent = 3 - piece_type
+        for board in [self.eyes] + self.lines:
+            if place:
+                board.place(p, piece_type)
+            rest = captured
+            while rest:
+                low = rest & -rest
+                if place:
+                    board.remove(low.bit_length() - 1, opponent)
+                else:
+                    board.place(low.bit_length() - 1, opponent)
+                rest ^= low
+            if not place:
+                board.remove(p, piece_type)
+
+    def play(self, go, i, j, piece_type):
+        '''
+        go.play 加上特征的增量更新
+        go.play with the features updated around the move.
+
+        :return: the undo record of go.play, or None if the placement is invalid.
+        '''
+        n = go.size
+        full, neighbors, not_first_col, not_last_col = board_geometry(n)
+        p = i * n + j
+        bit = 1 << p
+        opponent = 3 - piece_type
+        # The opponent chains whose last liberty is p are captured
+        around = neighbors[p]
+        before = go.chains_touching(around)
+        captured = 0
+        for color, stones, libs in before:
+            if color == opponent and libs == bit:
+                captured |= stones
+        if captured:
+            around |= (((captured & not_last_col) << 1) | ((captured & not_first_col) >> 1)
+                       | (captured << n) | (captured >> n)) & full
+            before = go.chains_touching(around)
+        record = go.play(i, j, piece_type)
+        if record is None:
+            return None
+        self.stack.append((self.vector, p, piece_type, captured))
+        self._change(p, piece_type, captured, True)
+
+        # The cache holds the vector from the view of the side to move, the opponent
+        key = None
+        if self.cache is not None:
+            key = go.zobrist_key(opponent)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.vector = cached if opponent == 1 else [cached[k] for k in SWAPPED]
+                return record
+        after = go.chains_touching(around | bit)
+        vector = list(self.vector)
+        for sign, chains in ((-1, before), (1, after)):
+            for color, stones, libs in chains:
+                liberties, atari = _chain_terms(stones, libs, neighbors)
+                vector[STONE_LIBERTIES + color - 1] += sign * liberties
+                vector[ATARI_STONES + color - 1] += sign * atari
+        vector[STONES + piece_type - 1] += 1
+        vector[STONES + opponent - 1] -= popcount(captured)
+        vector[EYES:EYES + 2] = self.eyes.counts
+        vector[LIVE_FOURS:LIVE_THREES + 2] = _line_counts(self.lines)
+        self.vector = vector
+        if key is not None:
+            self.cache.put(key, vector if opponent == 1 else [vector[k] for k in SWAPPED])
+        return record
+
+    def play_pass(self, go):
+        self.stack.append((self.vector, -1, 0, 0))
+        return go.play_pass()
+
+    def undo(self, go, record):
+        '''
+        go.undo，特征退回到这一手之前
+        go.undo with the features of the position before the move.
+        '''
+        go.undo(record)
+        self.vector, p, piece_type, captured = self.stack.pop()
+        if p >= 0:
+            self._change(p, piece_type, captured, False)
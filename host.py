@@ -1,13 +1,131 @@
 import sys
 
 import argparse
+import random
+from array import array
+from collections import namedtuple
 from copy import deepcopy
 
 from read import *
+from symmetry import SYMMETRY_COUNT, point_transforms
 from write import writeNextInput
 
 
+_GEOMETRY = {}
+_ZOBRIST = {}
+
+ZOBRIST_SEED = 561
+
+LegalMove = namedtuple('LegalMove', ['i', 'j', 'captured', 'liberties', 'rescued'])
+
+
+def board_geometry(n):
+    '''
+    每种棋盘大小只算一次的位运算常量
+    Precompute the bit masks of an n*n board. Point (i, j) is stored in bit i * n + j.
+
+    :param n: width and height of the board.
+    :return: (full mask, neighbor mask of every point, mask without the first column, mask without the last column).
+    '''
+    geometry = _GEOMETRY.get(n)
+    if geometry is None:
+        full = (1 << (n * n)) - 1
+        not_first_col = 0
+        not_last_col = 0
+        for i in range(n):
+            for j in range(n):
+                if j > 0:
+                    not_first_col |= 1 << (i * n + j)
+                if j < n - 1:
+                    not_last_col |= 1 << (i * n + j)
+        neighbors = []
+        for i in range(n):
+            for j in range(n):
+                mask = 0
+                if i > 0: mask |= 1 << ((i - 1) * n + j)
+                if i < n - 1: mask |= 1 << ((i + 1) * n + j)
+                if j > 0: mask |= 1 << (i * n + j - 1)
+                if j < n - 1: mask |= 1 << (i * n + j + 1)
+                neighbors.append(mask)
+        geometry = (full, neighbors, not_first_col, not_last_col)
+        _GEOMETRY[n] = geometry
+    return geometry
+
+
+def zobrist_table(n):
+    '''
+    固定种子的 Zobrist 随机数，每个进程算出来都一样
+    Deterministic 64-bit Zobrist numbers of an n*n board.
+
+    :param n: width and height of the board.
+    :return: (stones, side, ko, symmetric) where stones[piece_type][p] is the number of a stone on point p,
+             side[piece_type] is the number of the side to move, ko[p] is the number of a KO point and
+             symmetric[piece_type][p][t] is the number of that stone after symmetry t.
+    '''
+    table = _ZOBRIST.get(n)
+    if table is None:
+        rng = random.Random(ZOBRIST_SEED * 100 + n)
+        stones = [[0] * (n * n)] + [[rng.getrandbits(64) for p in range(n * n)] for piece_type in (1, 2)]
+        side = [0, rng.getrandbits(64), rng.getrandbits(64)]
+        ko = [rng.getrandbits(64) for p in range(n * n)]
+        transforms = point_transforms(n)
+        symmetric = [[tuple(numbers[perm[p]] for perm in transforms) for p in range(n * n)] for numbers in stones]
+        table = (stones, side, ko, symmetric)
+        _ZOBRIST[n] = table
+    return table
+
+
+def popcount(mask):
+    '''
+    数一下有几个1
+    Count the set bits of a bitboard.
+    '''
+    return bin(mask).count('1')
+
+
+class _Row(list):
+    '''
+    棋盘的一行，写进去的子会同步到位棋盘上
+    One row of GO.board. Writes go through to the bitboards so legacy code can keep doing board[i][j] = piece.
+    '''
+    __slots__ = ('_go', '_i')
+
+    def __setitem__(self, j, piece_type):
+        list.__setitem__(self, j, piece_type)
+        self._go._put(self._i, j % len(self), piece_type)
+
+    def __deepcopy__(self, memo):
+        return list(self)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class _Board(list):
+    '''
+    GO.board 的兼容视图：还是 board[i][j]，deepcopy 出来是普通的二维数组
+    List-of-lists view of the bitboards kept for existing players and host.judge.
+    '''
+    __slots__ = ('_go',)
+
+    def __setitem__(self, i, row):
+        for j, piece_type in enumerate(row):
+            self[i][j] = piece_type
+
+    def __deepcopy__(self, memo):
+        return [list(row) for row in self]
+
+    def __reduce__(self):
+        return list, ([list(row) for row in self],)
+
+
 class GO:
+    # 固定的属性，拷贝的时候只复制几个 buffer
+    __slots__ = ('size', 'X_move', 'n_move', 'max_move', 'komi', 'verbose',
+                 '_full', '_neighbors', '_not_first_col', '_not_last_col', '_zobrist', '_transforms',
+                 '_stones', '_prev', '_cells', '_hashes', '_prev_hash', '_died',
+                 '_chain', '_chain_stones', '_chain_libs', '_grid', '_prev_grid')
+
     def __init__(self, n):
         """
         Go game.
@@ -27,6 +145,511 @@ class GO:
         '''在初始化对象时就设置好了，不是接受的参数'''
         self.verbose = False
         '''人下:True, 程序下：False; Verbose only when there is a manual player'''
+        self._full, self._neighbors, self._not_first_col, self._not_last_col = board_geometry(n)
+        '''位棋盘：下标是棋子颜色，_stones[1] 是 X 的子，_stones[2] 是 O 的子（下标 0 不用）'''
+        self._stones = [0, 0, 0]
+        self._prev = [0, 0, 0]
+        # 每个点的颜色，一维：_cells[i * n + j]；self.board 是按需从这里生成的二维视图
+        self._cells = bytearray(n * n)
+        # 棋子的 Zobrist 值，跟着落子/提子增量更新；_hashes[t] 是按第 t 种对称变换后的棋盘的值，_hashes[0] 就是原棋盘
+        self._zobrist = zobrist_table(n)
+        self._transforms = point_transforms(n)
+        self._hashes = [0] * SYMMETRY_COUNT
+        self._prev_hash = 0
+        self._grid = None
+        self._prev_grid = None
+        # 每个子所在块的编号（块里最小的那个点），以及每块的子和气，落子/提子时增量更新
+        self._chain = array('h', [-1]) * (n * n)
+        self._chain_stones = [0] * (n * n)
+        self._chain_libs = [0] * (n * n)
+
+    @property
+    def board(self):
+        '''
+        当前棋盘，还是二维数组的样子
+        The current board as a list of lists backed by the bitboards.
+        '''
+        grid = self._grid
+        if grid is None:
+            grid = self._grid = self._make_grid()
+        return grid
+
+    @board.setter
+    def board(self, board):
+        if board is not None and board is self._grid:
+            return
+        self._stones = self._board_to_bits(board)
+        self._cells = self._cells_of(self._stones)
+        self._hashes = self._hashes_of(self._stones)
+        self._grid = None
+        self._rebuild_chains()
+
+    @property
+    def died_pieces(self):
+        '''
+        上一手被提掉的子（打劫要用）
+        The stones captured by the last move, used by the KO rule.
+        '''
+        return self._points(self._died)
+
+    @died_pieces.setter
+    def died_pieces(self, positions):
+        n = self.size
+        died = 0
+        for piece in positions:
+            died |= 1 << (piece[0] * n + piece[1])
+        self._died = died
+
+    @property
+    def previous_board(self):
+        '''
+        上一手之前的棋盘
+        The board before the last placement as a list of lists.
+        '''
+        if self._prev_grid is None:
+            self._prev_grid = self._bits_to_board(self._prev)
+        return self._prev_grid
+
+    @previous_board.setter
+    def previous_board(self, board):
+        self._prev = self._board_to_bits(board)
+        self._prev_hash = self._hashes_of(self._prev)[0]
+        self._prev_grid = None
+
+    def clone(self):
+        '''
+        复制一个 go 对象：几个整数和几个 buffer，二维视图等用到的时候再生成
+        Copy the game state with a handful of buffer copies. The list view of the board is rebuilt on demand.
+
+        :return: the copied GO instance.
+        '''
+        new_go = object.__new__(type(self))
+        new_go.size = self.size
+        new_go.X_move = self.X_move
+        new_go.n_move = self.n_move
+        new_go.max_move = self.max_move
+        new_go.komi = self.komi
+        new_go.verbose = self.verbose
+        new_go._full = self._full
+        new_go._neighbors = self._neighbors
+        new_go._not_first_col = self._not_first_col
+        new_go._not_last_col = self._not_last_col
+        new_go._zobrist = self._zobrist
+        new_go._transforms = self._transforms
+        new_go._stones = self._stones[:]
+        new_go._prev = self._prev  # never modified in place, only replaced
+        new_go._cells = self._cells[:]
+        new_go._hashes = self._hashes[:]
+        new_go._prev_hash = self._prev_hash
+        new_go._died = self._died
+        new_go._chain = self._chain[:]
+        new_go._chain_stones = self._chain_stones[:]
+        new_go._chain_libs = self._chain_libs[:]
+        new_go._grid = None
+        new_go._prev_grid = None
+        return new_go
+
+    def __deepcopy__(self, memo):
+        '''
+        deepcopy(go) 直接走 clone
+        Copy the game without walking the generic deepcopy machinery.
+        '''
+        return self.clone()
+
+    def __getstate__(self):
+        '''
+        pickle 的时候不带棋盘视图和按棋盘大小算好的表
+        Pickle the game state without the cached views and the per-size tables.
+        '''
+        skip = ('_grid', '_prev_grid', '_full', '_neighbors', '_not_first_col', '_not_last_col', '_zobrist', '_transforms')
+        return {name: getattr(self, name) for name in GO.__slots__ if name not in skip}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        n = self.size
+        self._full, self._neighbors, self._not_first_col, self._not_last_col = board_geometry(n)
+        self._zobrist = zobrist_table(n)
+        self._transforms = point_transforms(n)
+        self._grid = None
+        self._prev_grid = None
+
+    def zobrist_key(self, piece_type):
+        '''
+        局面的 Zobrist 值：棋子 + 轮到谁下 + 劫的位置，O(1)
+        Zobrist key of the position with piece_type to move, including the KO point.
+
+        :param piece_type: 1('X') or 2('O'), the side to move.
+        :return: a 64-bit integer.
+        '''
+        key = self._hashes[0] ^ self._zobrist[1][piece_type]
+        ko_point = self._ko_point(piece_type)
+        if ko_point >= 0:
+            key ^= self._zobrist[2][ko_point]
+        return key
+
+    def canonical_key(self, piece_type):
+        '''
+        8 种对称里最小的那个 Zobrist 值，对称的局面拿到同一个 key
+        Symmetry-independent Zobrist key of the position with piece_type to move.
+        Moves stored under this key should be saved with symmetry.transform_move(move, t, n)
+        and read back with symmetry.restore_move(move, t, n).
+
+        :param piece_type: 1('X') or 2('O'), the side to move.
+        :return: (key, t) where t is the symmetry that maps this board onto the canonical one.
+        '''
+        side = self._zobrist[1][piece_type]
+        ko_point = self._ko_point(piece_type)
+        best_key = -1
+        best_t = 0
+        for t in range(SYMMETRY_COUNT):
+            key = self._hashes[t] ^ side
+            if ko_point >= 0:
+                key ^= self._zobrist[2][self._transforms[t][ko_point]]
+            if best_key < 0 or key < best_key:
+                best_key = key
+                best_t = t
+        return best_key, best_t
+
+    def _ko_point(self, piece_type):
+        '''
+        piece_type 可能因为打劫不能下的点，没有就返回 -1
+        The point piece_type may be kept from playing by the KO rule, or -1.
+        '''
+        died = self._died
+        # Only a single stone captured last move can be a KO point for the side to move
+        if died and not died & (died - 1) and self._prev[piece_type] == self._stones[piece_type] | died:
+            return died.bit_length() - 1
+        return -1
+
+    def _hashes_of(self, stones):
+        '''
+        从头算一遍棋子在 8 种对称下的 Zobrist 值
+        Zobrist hashes of a pair of bitboards under every symmetry.
+        '''
+        hashes = [0] * SYMMETRY_COUNT
+        for piece_type in (1, 2):
+            numbers = self._zobrist[3][piece_type]
+            mask = stones[piece_type]
+            while mask:
+                low = mask & -mask
+                self._toggle_hashes(hashes, numbers[low.bit_length() - 1])
+                mask ^= low
+        return hashes
+
+    def _toggle_hashes(self, hashes, numbers):
+        '''
+        一个点放上/拿走一个子，8 个 Zobrist 值一起更新
+        XOR the numbers of one stone into the hashes of every symmetry.
+        '''
+        for t in range(SYMMETRY_COUNT):
+            hashes[t] ^= numbers[t]
+
+    def _board_to_bits(self, board):
+        '''
+        二维数组 -> 位棋盘
+        Convert a list-of-lists board into per color bitboards.
+        '''
+        n = self.size
+        stones = [0, 0, 0]
+        for i in range(n):
+            row = board[i]
+            for j in range(n):
+                if row[j]:
+                    stones[row[j]] |= 1 << (i * n + j)
+        return stones
+
+    def _bits_to_board(self, stones):
+        '''
+        位棋盘 -> 二维数组
+        Convert per color bitboards into a plain list-of-lists board.
+        '''
+        n = self.size
+        black, white = stones[1], stones[2]
+        board = []
+        for i in range(n):
+            row = []
+            for j in range(n):
+                bit = 1 << (i * n + j)
+                row.append(1 if black & bit else 2 if white & bit else 0)
+            board.append(row)
+        return board
+
+    def _cells_of(self, stones):
+        '''
+        位棋盘 -> 一维的每个点的颜色
+        Convert per color bitboards into the flat cell array.
+        '''
+        cells = bytearray(self.size * self.size)
+        for piece_type in (1, 2):
+            mask = stones[piece_type]
+            while mask:
+                low = mask & -mask
+                cells[low.bit_length() - 1] = piece_type
+                mask ^= low
+        return cells
+
+    def _make_grid(self):
+        '''
+        按一维的 _cells 生成 self.board 的兼容视图
+        Build the list-of-lists view of the flat cell array.
+        '''
+        n = self.size
+        cells = self._cells
+        grid = _Board()
+        grid._go = self
+        for i in range(n):
+            row = _Row(cells[i * n:(i + 1) * n])
+            row._go = self
+            row._i = i
+            list.append(grid, row)
+        return grid
+
+    def _put(self, i, j, piece_type):
+        '''
+        只改位棋盘上的一个点（视图已经改好了）
+        Set one point of the bitboards after the list view was written to.
+        '''
+        p = i * self.size + j
+        if (self._stones[1] | self._stones[2]) >> p & 1:
+            self._remove_stones(1 << p)
+        if piece_type:
+            self._add_stone(p, piece_type)
+
+    def _rebuild_chains(self):
+        '''
+        从头给所有的块编号，并算好每块的气
+        Label every chain from scratch and compute its liberties.
+        '''
+        nn = self.size * self.size
+        self._chain = array('h', [-1]) * nn
+        self._chain_stones = [0] * nn
+        self._chain_libs = [0] * nn
+        empty = self._color_mask(0)
+        for piece_type in (1, 2):
+            stones = self._stones[piece_type]
+            rest = stones
+            while rest:
+                group = self._flood(rest & -rest, stones)
+                self._label_chain(group, self._dilate(group) & empty)
+                rest &= ~group
+
+    def _label_chain(self, group, libs):
+        '''
+        把 group 记成一块，编号是块里最小的点
+        Record group as one chain rooted at its lowest point.
+        '''
+        root = (group & -group).bit_length() - 1
+        self._chain_stones[root] = group
+        self._chain_libs[root] = libs
+        chain = self._chain
+        while group:
+            low = group & -group
+            chain[low.bit_length() - 1] = root
+            group ^= low
+
+    def _add_stone(self, p, piece_type):
+        '''
+        在空点 p 放一个子：并到相邻的友军块里，相邻的敌块少一口气（不提子）
+        Put a stone on the empty point p and merge it with the adjacent allied chains. Captures are left to the caller.
+        '''
+        bit = 1 << p
+        n = self.size
+        stones = self._stones
+        stones[piece_type] |= bit
+        self._toggle_hashes(self._hashes, self._zobrist[3][piece_type][p])
+        self._cells[p] = piece_type
+        if self._grid is not None:
+            list.__setitem__(self._grid[p // n], p % n, piece_type)
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        neighbors = self._neighbors[p]
+
+        # Merge into the biggest adjacent allied chain so that only the smaller ones get relabelled
+        root = -1
+        group = bit
+        libs = neighbors & ~(stones[1] | stones[2])
+        allies = neighbors & stones[piece_type]
+        while allies:
+            ally_root = chain[(allies & -allies).bit_length() - 1]
+            ally_stones = chain_stones[ally_root]
+            if root < 0 or popcount(ally_stones) > popcount(chain_stones[root]):
+                root = ally_root
+            group |= ally_stones
+            libs |= chain_libs[ally_root]
+            allies &= ~ally_stones
+        if root < 0:
+            root = p
+            relabel = bit
+        else:
+            relabel = group & ~chain_stones[root]
+        chain_stones[root] = group
+        chain_libs[root] = libs & ~bit
+        while relabel:
+            low = relabel & -relabel
+            chain[low.bit_length() - 1] = root
+            relabel ^= low
+
+        enemies = neighbors & stones[3 - piece_type]
+        while enemies:
+            enemy_root = chain[(enemies & -enemies).bit_length() - 1]
+            chain_libs[enemy_root] &= ~bit
+            enemies &= ~chain_stones[enemy_root]
+
+    def _remove_stones(self, mask):
+        '''
+        把 mask 里的子拿掉：被拆开的块重新编号，旁边的块多出气来
+        Remove the stones of mask. Chains that lose only part of their stones are relabelled, and the freed points become liberties of the adjacent chains.
+        '''
+        n = self.size
+        stones = self._stones
+        stones[1] &= ~mask
+        stones[2] &= ~mask
+        cells = self._cells
+        grid = self._grid
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        numbers = self._zobrist[3]
+        hashes = self._hashes
+
+        broken = 0
+        rest = mask
+        while rest:
+            low = rest & -rest
+            q = low.bit_length() - 1
+            self._toggle_hashes(hashes, numbers[cells[q]][q])
+            cells[q] = 0
+            if grid is not None:
+                list.__setitem__(grid[q // n], q % n, 0)
+            root = chain[q]
+            if root >= 0:
+                broken |= chain_stones[root] & ~mask
+                chain[q] = -1
+            rest ^= low
+
+        # Only removing part of a chain (never a capture) can split it
+        if broken:
+            empty = self._color_mask(0)
+            for piece_type in (1, 2):
+                part = broken & stones[piece_type]
+                while part:
+                    group = self._flood(part & -part, stones[piece_type])
+                    self._label_chain(group, self._dilate(group) & empty)
+                    part &= ~group
+
+        occupied = stones[1] | stones[2]
+        rest = mask
+        while rest:
+            low = rest & -rest
+            around = self._neighbors[low.bit_length() - 1] & occupied
+            while around:
+                s = around & -around
+                chain_libs[chain[s.bit_length() - 1]] |= low
+                around ^= s
+            rest ^= low
+
+    def _points(self, mask):
+        '''
+        位棋盘 -> 按行优先排好的坐标列表
+        List the (row, column) of every set bit in row-major order.
+        '''
+        n = self.size
+        points = []
+        while mask:
+            low = mask & -mask
+            p = low.bit_length() - 1
+            points.append((p // n, p % n))
+            mask ^= low
+        return points
+
+    def _dilate(self, mask):
+        '''
+        一步膨胀：返回 mask 里所有子的相邻点
+        Shift a bitboard one step in the four directions.
+        '''
+        n = self.size
+        return (((mask & self._not_last_col) << 1) | ((mask & self._not_first_col) >> 1)
+                | (mask << n) | (mask >> n)) & self._full
+
+    def _flood(self, seed, stones):
+        '''
+        从 seed 出发找出整块棋
+        Grow seed through stones until the whole connected group is covered.
+        '''
+        group = seed
+        while True:
+            grown = (self._dilate(group) & stones) | group
+            if grown == group:
+                return group
+            group = grown
+
+    def _color_mask(self, piece_type):
+        '''
+        piece_type 的位棋盘，0 表示空点
+        Bitboard of the points holding piece_type (0 for empty points).
+        '''
+        if piece_type:
+            return self._stones[piece_type]
+        return self._full & ~(self._stones[1] | self._stones[2])
+
+    def _dead_chains(self, piece_type):
+        '''
+        piece_type 所有没气的块（直接看记好的气，不用再搜）
+        Union of the chains of piece_type that have no liberty left.
+        '''
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        dead = 0
+        rest = self._stones[piece_type]
+        while rest:
+            root = chain[(rest & -rest).bit_length() - 1]
+            if not chain_libs[root]:
+                dead |= chain_stones[root]
+            rest &= ~chain_stones[root]
+        return dead
+
+    def chains(self, piece_type):
+        '''
+        piece_type 的每一块棋：(子, 气)，都是位棋盘，直接用增量记好的编号，不用再搜
+        The chains of piece_type from the incrementally kept labels.
+
+        :param piece_type: 1('X') or 2('O').
+        :return: a list of (stones, liberties) bitboards, one per chain.
+        '''
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        chains = []
+        rest = self._stones[piece_type]
+        while rest:
+            root = chain[(rest & -rest).bit_length() - 1]
+            chains.append((chain_stones[root], chain_libs[root]))
+            rest &= ~chain_stones[root]
+        return chains
+
+    def chains_touching(self, mask):
+        '''
+        有子在 mask 里的每一块棋：(颜色, 子, 气)
+        The chains with a stone in mask.
+
+        :param mask: bitboard of points.
+        :return: a list of (piece_type, stones, liberties), one per chain.
+        '''
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        cells = self._cells
+        chains = []
+        rest = mask & (self._stones[1] | self._stones[2])
+        while rest:
+            p = (rest & -rest).bit_length() - 1
+            root = chain[p]
+            chains.append((cells[p], chain_stones[root], chain_libs[root]))
+            rest &= ~chain_stones[root]
+        return chains
 
     def init_board(self, n):
         '''
@@ -56,10 +679,12 @@ class GO:
         # 'X' pieces marked as 1
         # 'O' pieces marked as 2
 
+        died_pieces = []
         for i in range(self.size):
             for j in range(self.size):
                 if previous_board[i][j] == piece_type and board[i][j] != piece_type:
-                    self.died_pieces.append((i, j))
+                    died_pieces.append((i, j))
+        self.died_pieces = died_pieces
 
         # self.piece_type = piece_type
         self.previous_board = previous_board
@@ -86,7 +711,7 @@ class GO:
         :param: None.
         :return: the copied board instance.
         '''
-        return deepcopy(self)
+        return self.clone()
 
     def detect_neighbor(self, i, j):
         '''
@@ -95,14 +720,7 @@ class GO:
         :param j: column number of the board.
         :return: a list containing the neighbors row and column (row, column) of position (i, j).
         '''
-        board = self.board
-        neighbors = []
-        # Detect borders and add neighbor coordinates
-        if i > 0: neighbors.append((i - 1, j))
-        if i < len(board) - 1: neighbors.append((i + 1, j))
-        if j > 0: neighbors.append((i, j - 1))
-        if j < len(board) - 1: neighbors.append((i, j + 1))
-        return neighbors
+        return self._points(self._neighbors[i * self.size + j])
 
     def detect_neighbor_ally(self, i, j):
         '''
@@ -112,15 +730,8 @@ class GO:
         :param j: column number of the board.
         :return: a list containing the neighbored allies row and column (row, column) of position (i, j).
         '''
-        board = self.board
-        neighbors = self.detect_neighbor(i, j)  # Detect neighbors
-        group_allies = []
-        # Iterate through neighbors
-        for piece in neighbors:
-            # Add to allies list if having the same color
-            if board[piece[0]][piece[1]] == board[i][j]:
-                group_allies.append(piece)
-        return group_allies
+        allies = self._color_mask(self._cells[i * self.size + j])
+        return self._points(self._neighbors[i * self.size + j] & allies)
 
     def ally_dfs(self, i, j):
         '''
@@ -130,16 +741,10 @@ class GO:
         :param j: column number of the board.
         :return: a list containing the all allies row and column (row, column) of position (i, j).
         '''
-        stack = [(i, j)]  # stack for DFS serach
-        ally_members = []  # record allies positions during the search
-        while stack:
-            piece = stack.pop()
-            ally_members.append(piece)
-            neighbor_allies = self.detect_neighbor_ally(piece[0], piece[1])
-            for ally in neighbor_allies:
-                if ally not in stack and ally not in ally_members:
-                    stack.append(ally)
-        return ally_members
+        p = i * self.size + j
+        if self._chain[p] >= 0:
+            return self._points(self._chain_stones[self._chain[p]])
+        return self._points(self._flood(1 << p, self._color_mask(0)))
 
     def find_liberty(self, i, j):
         '''
@@ -150,16 +755,11 @@ class GO:
         :param j: column number of the board.
         :return: boolean indicating whether the given stone still has liberty.
         '''
-        board = self.board
-        ally_members = self.ally_dfs(i, j)
-        for member in ally_members:
-            neighbors = self.detect_neighbor(member[0], member[1])
-            for piece in neighbors:
-                # If there is empty space around a piece, it has liberty
-                if board[piece[0]][piece[1]] == 0:
-                    return True
-        # If none of the pieces in a allied group has an empty space, it has no liberty
-        return False
+        p = i * self.size + j
+        if self._chain[p] >= 0:
+            return bool(self._chain_libs[self._chain[p]])
+        empty = self._color_mask(0)
+        return bool(self._dilate(self._flood(1 << p, empty)) & empty)
 
     def find_died_pieces(self, piece_type):
         '''
@@ -169,17 +769,7 @@ class GO:
         :param piece_type: 1('X') or 2('O').
         :return: a list containing the dead pieces row and column(row, column).
         '''
-        board = self.board
-        died_pieces = []
-
-        for i in range(len(board)):
-            for j in range(len(board)):
-                # Check if there is a piece at this position:
-                if board[i][j] == piece_type:
-                    # The piece die if it has no liberty
-                    if not self.find_liberty(i, j):
-                        died_pieces.append((i, j))
-        return died_pieces
+        return self._points(self._dead_chains(piece_type))
 
     def remove_died_pieces(self, piece_type):
         '''
@@ -190,10 +780,10 @@ class GO:
         :return: locations of dead pieces.
         '''
 
-        died_pieces = self.find_died_pieces(piece_type)
-        if not died_pieces: return []
-        self.remove_certain_pieces(died_pieces)
-        return died_pieces
+        dead = self._dead_chains(piece_type)
+        if not dead: return []
+        self._remove_stones(dead)
+        return self._points(dead)
 
     def remove_certain_pieces(self, positions):
         '''
@@ -202,10 +792,11 @@ class GO:
         :param positions: a list containing the pieces to be removed row and column(row, column)
         :return: None.
         '''
-        board = self.board
+        n = self.size
+        mask = 0
         for piece in positions:
-            board[piece[0]][piece[1]] = 0
-        self.update_board(board)
+            mask |= 1 << (piece[0] * n + piece[1])
+        self._remove_stones(mask & (self._stones[1] | self._stones[2]))
 
     def place_chess(self, i, j, piece_type):
         """
@@ -217,14 +808,13 @@ class GO:
         param piece_type: 1('X') or 2('O').
         return boolean indicating whether the placement is valid.
         """
-        board = self.board
-
         valid_place = self.valid_place_check(i, j, piece_type)
         if not valid_place:
             return False
-        self.previous_board = deepcopy(board)
-        board[i][j] = piece_type
-        self.update_board(board)
+        self._prev = list(self._stones)
+        self._prev_grid = None
+        self._prev_hash = self._hashes[0]
+        self._add_stone(i * self.size + j, piece_type)
         # Remove the following line for HW2 CS561 S2020
         # self.n_move += 1
         return True
@@ -232,6 +822,7 @@ class GO:
     def valid_place_check(self, i, j, piece_type, test_check=False):
         '''
         检测落点是否有效：是否在棋盘范围内；这个位置是否已经有子了；下在这是不是会自杀；是不是在老打一个劫；只是检测，不会改棋盘
+        全部用位运算在原棋盘上算，不再拷贝整个对象
         Check whether a placement is valid.
 
         :param i: row number of the board.
@@ -240,57 +831,251 @@ class GO:
         :param test_check: boolean if it's a test check.
         :return: boolean indicating whether the placement is valid.
         '''
-        board = self.board
+        n = self.size
         verbose = self.verbose
         if test_check:
             verbose = False
 
         # Check if the place is in the board range
-        if not (i >= 0 and i < len(board)):
+        if not (i >= 0 and i < n):
             if verbose:
-                print(('Invalid placement. row should be in the range 1 to {}.').format(len(board) - 1))
+                print(('Invalid placement. row should be in the range 1 to {}.').format(n - 1))
             return False
-        if not (j >= 0 and j < len(board)):
+        if not (j >= 0 and j < n):
             if verbose:
-                print(('Invalid placement. column should be in the range 1 to {}.').format(len(board) - 1))
+                print(('Invalid placement. column should be in the range 1 to {}.').format(n - 1))
             return False
 
         # Check if the place already has a piece
-        if board[i][j] != 0:
+        p = i * n + j
+        bit = 1 << p
+        stones = self._stones
+        if (stones[1] | stones[2]) & bit:
             if verbose:
                 print('Invalid placement. There is already a chess in this position.')
             return False
 
-        # Copy the board for testing
-        # 把自己重新拷贝了一分（不只是棋盘）
-        test_go = self.copy_board()
-        test_board = test_go.board
-
         # Check if the place has liberty
         # 如果下进去还有气，那随便下
-        test_board[i][j] = piece_type
-        test_go.update_board(test_board)
-        if test_go.find_liberty(i, j):
+        # 只看相邻的块：有空点，或者连上的友军块还有别的气
+        own = stones[piece_type]
+        opp = stones[3 - piece_type]
+        neighbors = self._neighbors[p]
+        if neighbors & ~(own | opp):
             return True
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        group = bit
+        allies = neighbors & own
+        while allies:
+            root = chain[(allies & -allies).bit_length() - 1]
+            if chain_libs[root] & ~bit:
+                return True
+            group |= chain_stones[root]
+            allies &= ~chain_stones[root]
 
         # If not, remove the died pieces of opponent and check again
-        # 下进去没气，看看是不是吃对手的棋
-        test_go.remove_died_pieces(3 - piece_type)
-        # 提子了，还是没气，那就不能下
-        if not test_go.find_liberty(i, j):
+        # 下进去没气，看看是不是吃对手的棋（相邻的敌块只剩这一口气）；提子了，还是没气，那就不能下
+        captured = 0
+        enemies = neighbors & opp
+        while enemies:
+            root = chain[(enemies & -enemies).bit_length() - 1]
+            if not chain_libs[root] & ~bit:
+                captured |= chain_stones[root]
+            enemies &= ~chain_stones[root]
+        # 摆出来的局面里本来就没气的敌块，也会跟着一起提掉
+        captured |= self._dead_chains(3 - piece_type)
+        if not self._dilate(group) & captured:
             if verbose:
                 print('Invalid placement. No liberty found in this position.')
             return False
 
         # Check special case: repeat placement causing the repeat board state (KO rule)
-        else:
-            # 提子了，有气，那看看是不是打劫，是的话也不行。
-            if self.died_pieces and self.ifTwoBoardSame(self.previous_board, test_go.board):
-                if verbose:
-                    print('Invalid placement. A repeat move not permitted by the KO rule.')
-                return False
+        # 提子了，有气，那看看是不是打劫，是的话也不行。
+        if self._died and self._repeats_previous(p, piece_type, captured):
+            if verbose:
+                print('Invalid placement. A repeat move not permitted by the KO rule.')
+            return False
         return True
 
+    def _repeats_previous(self, p, piece_type, captured):
+        '''
+        在 p 落子并提掉 captured 之后，是不是又回到了上一手之前的棋盘（打劫）
+        用增量的 Zobrist 值比较，只有值相等时才再对一下位棋盘
+        Check whether placing at p and removing captured recreates the previous board (KO rule).
+        '''
+        numbers = self._zobrist[0]
+        h = self._hashes[0] ^ numbers[piece_type][p]
+        rest = captured
+        while rest:
+            low = rest & -rest
+            h ^= numbers[3 - piece_type][low.bit_length() - 1]
+            rest ^= low
+        if h != self._prev_hash:
+            return False
+        stones = self._stones
+        return (self._prev[piece_type] == stones[piece_type] | (1 << p)
+                and self._prev[3 - piece_type] == stones[3 - piece_type] & ~captured)
+
+    def legal_moves(self, piece_type):
+        '''
+        一次算出 piece_type 所有能下的点，以及每一手会提掉的子和下完之后这块棋的气
+        所有点共用同一份块和气的信息，打劫直接跟 previous_board 的位棋盘比，不拷贝棋盘
+        Find every legal placement of piece_type in one pass over the current chains.
+
+        :param piece_type: 1('X') or 2('O').
+        :return: a list of LegalMove(i, j, captured, liberties, rescued) in row-major order, where captured lists
+                 the opponent stones the move removes, liberties is the liberty count of the placed stone's chain
+                 and rescued is the number of own stones in atari that the move gives a second liberty.
+        '''
+        n = self.size
+        stones = self._stones
+        own = stones[piece_type]
+        opp = stones[3 - piece_type]
+        empty = self._full & ~(own | opp)
+        chain = self._chain
+        chain_stones = self._chain_stones
+        chain_libs = self._chain_libs
+        neighbors_of = self._neighbors
+        # 摆出来的局面里本来就没气的敌块，不管下在哪都会被提掉
+        dead_opp = self._dead_chains(3 - piece_type)
+
+        moves = []
+        rest = empty
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            p = low.bit_length() - 1
+            neighbors = neighbors_of[p]
+
+            group = low
+            libs = neighbors & empty
+            in_atari = 0
+            allies = neighbors & own
+            while allies:
+                root = chain[(allies & -allies).bit_length() - 1]
+                group |= chain_stones[root]
+                libs |= chain_libs[root]
+                if chain_libs[root] == low:
+                    in_atari |= chain_stones[root]
+                allies &= ~chain_stones[root]
+            libs &= ~low
+
+            captured = dead_opp
+            enemies = neighbors & opp
+            while enemies:
+                root = chain[(enemies & -enemies).bit_length() - 1]
+                if not chain_libs[root] & ~low:
+                    captured |= chain_stones[root]
+                enemies &= ~chain_stones[root]
+            if libs:
+                if captured:
+                    libs |= self._dilate(group) & captured
+            else:
+                # No liberty unless the move captures; then check the KO rule against the previous board
+                libs = self._dilate(group) & captured
+                if not libs:
+                    continue
+                if self._died and self._repeats_previous(p, piece_type, captured):
+                    continue
+            liberties = popcount(libs)
+            rescued = popcount(in_atari) if liberties > 1 else 0
+            moves.append(LegalMove(p // n, p % n, self._points(captured), liberties, rescued))
+        return moves
+
+    def play(self, i, j, piece_type):
+        '''
+        落子并提子，返回一个悔棋用的记录；不能下就返回 None
+        Place a stone, remove the captured opponent stones and update the KO state in place.
+
+        :param i: row number of the board.
+        :param j: column number of the board.
+        :param piece_type: 1('X') or 2('O').
+        :return: an undo record for GO.undo, or None if the placement is invalid.
+        '''
+        if not self.valid_place_check(i, j, piece_type, test_check=True):
+            return None
+        p = i * self.size + j
+        record = (p, piece_type, self._prev, self._prev_grid, self._prev_hash, self._died)
+        self._prev = list(self._stones)
+        self._prev_grid = None
+        self._prev_hash = self._hashes[0]
+        self._add_stone(p, piece_type)
+        captured = self._dead_chains(3 - piece_type)
+        if captured:
+            self._remove_stones(captured)
+        self._died = captured
+        self.n_move += 1
+        return record
+
+    def play_pass(self):
+        '''
+        这一手 PASS，返回悔棋用的记录
+        Pass the turn: the current board becomes the previous board.
+
+        :return: an undo record for GO.undo.
+        '''
+        record = (-1, 0, self._prev, self._prev_grid, self._prev_hash, self._died)
+        self._prev = list(self._stones)
+        self._prev_grid = None
+        self._prev_hash = self._hashes[0]
+        self.n_move += 1
+        return record
+
+    def undo(self, record):
+        '''
+        按 play/play_pass 返回的记录悔一手：棋盘、上一手的棋盘、被提的子和打劫状态都恢复原样
+        Take back a move made by play or play_pass, restoring the board, previous board, captured stones and KO state.
+
+        :param record: the undo record of the last move.
+        :return: None.
+        '''
+        p, piece_type, prev, prev_grid, prev_hash, died = record
+        if p >= 0:
+            # The stones captured by this move are exactly the ones missing from the previous board
+            captured = self._prev[3 - piece_type] & ~self._stones[3 - piece_type]
+            self._remove_stones(1 << p)
+            if captured:
+                self._restore_stones(captured, 3 - piece_type)
+        self._prev = prev
+        self._prev_grid = prev_grid
+        self._prev_hash = prev_hash
+        self._died = died
+        self.n_move -= 1
+
+    def _restore_stones(self, mask, piece_type):
+        '''
+        把提掉的子放回去：重新编块，旁边的块少了这些气
+        Put captured stones of piece_type back, relabelling their chains and taking the points away from the adjacent chains.
+        '''
+        n = self.size
+        stones = self._stones
+        stones[piece_type] |= mask
+        grid = self._grid
+        chain = self._chain
+        chain_libs = self._chain_libs
+        empty = self._color_mask(0)
+        rest = mask
+        while rest:
+            group = self._flood(rest & -rest, stones[piece_type])
+            self._label_chain(group, self._dilate(group) & empty)
+            rest &= ~group
+        rest = mask
+        while rest:
+            low = rest & -rest
+            q = low.bit_length() - 1
+            self._toggle_hashes(self._hashes, self._zobrist[3][piece_type][q])
+            self._cells[q] = piece_type
+            if grid is not None:
+                list.__setitem__(grid[q // n], q % n, piece_type)
+            around = self._neighbors[q] & stones[3 - piece_type]
+            while around:
+                s = around & -around
+                chain_libs[chain[s.bit_length() - 1]] &= ~low
+                around ^= s
+            rest ^= low
+
     def update_board(self, new_board):
         '''
         直接给你换张棋盘
@@ -336,7 +1121,7 @@ class GO:
         if self.n_move >= self.max_move:
             return True
         # Case 2: two players all pass the move.
-        if self.ifTwoBoardSame(self.previous_board, self.board) and action == "PASS":
+        if self._prev[1:] == self._stones[1:] and action == "PASS":
             return True
         return False
 
@@ -349,13 +1134,7 @@ class GO:
         :return: boolean indicating whether the game should end.
         '''
 
-        board = self.board
-        cnt = 0
-        for i in range(self.size):
-            for j in range(self.size):
-                if board[i][j] == piece_type:
-                    cnt += 1
-        return cnt
+        return popcount(self._stones[piece_type])
 
     def judge_winner(self):
         '''
@@ -375,7 +1154,7 @@ class GO:
         else:
             return 0
 
-    def play(self, player1, player2, verbose=False):
+    def play_game(self, player1, player2, verbose=False):
         '''
         The game starts!
 
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: mcts_player
+# Description: 蒙特卡洛树搜索（UCT / PUCT）的 player，规则跟 host.GO 一样：贴目 n/2，最多 n*n-1 手，打劫，数子
+# TodoList:
+
+import math
+import random
+import time
+from array import array
+
+from host import GO, board_geometry, popcount
+from move_clock import CLOCK_PATH, MoveClock
+from opening_book import BOOK_PATH, OpeningBook
+from read import readInput
+from write import writeOutput
+
+PLAYOUTS = 50000  # playout budget of one move
+TIME_LIMIT = 8.0  # seconds per move, under the grader's 10 s with room for start-up and I/O
+PASS = -1
+
+
+class _Tree:
+    def __init__(self):
+        '''
+        整棵树放在几个定长类型的数组里：一个结点的孩子在数组里连续存放
+        Search tree stored as parallel typed arrays; the children of a node are contiguous.
+        '''
+        self.first_child = array('i')  # index of the first child, -1 until expanded
+        self.child_count = array('h')
+        self.move = array('b')  # point i * n + j of the move leading here, PASS = -1
+        self.visits = array('i')
+        self.wins = array('d')  # wins of the player who made the move leading here
+        self.prior = array('d')
+
+    def __len__(self):
+        return len(self.move)
+
+    def add(self, move, prior):
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.move.append(move)
+        self.visits.append(0)
+        self.wins.append(0.0)
+        self.prior.append(prior)
+        return len(self.move) - 1
+
+
+class _Position:
+    def __init__(self, n, stones, previous, died, n_move, passes):
+        '''
+        只用位棋盘的轻量局面，给 playout 用，规则跟 GO.valid_place_check / GO.play 一致
+        Light bitboard position for tree descent and playouts, with the rules of GO.valid_place_check.
+
+        :param stones: [0, black bits, white bits].
+        :param previous: the same for the previous board (KO rule).
+        :param died: whether the last placement captured anything.
+        :param n_move: moves played so far.
+        :param passes: consecutive passes just played.
+        '''
+        self.size = n
+        self.full, self.neighbors, self.not_first_col, self.not_last_col = board_geometry(n)
+        self.stones = stones
+        self.previous = previous
+        self.died = died
+        self.n_move = n_move
+        self.passes = passes
+
+    @classmethod
+    def from_go(cls, go):
+        '''
+        从 GO 对象的两个棋盘建位棋盘；棋盘跟上一手一样、又不是空棋盘，就是对手刚 PASS 了
+        The position of go, with passes = 1 when the opponent just passed (the board did not
+        change and is not empty).
+        '''
+        n = go.size
+        position = cls(n, [0, 0, 0], [0, 0, 0], bool(go.died_pieces), go.n_move, 0)
+        for i in range(n):
+            for j in range(n):
+                p = i * n + j
+                if go.board[i][j]:
+                    position.stones[go.board[i][j]] |= 1 << p
+                if go.previous_board[i][j]:
+                    position.previous[go.previous_board[i][j]] |= 1 << p
+        if position.stones == position.previous and position.stones[1] | position.stones[2]:
+            position.passes = 1  # passing back ends the game
+        return position
+
+    def copy(self):
+        return _Position(self.size, list(self.stones), self.previous, self.died, self.n_move, self.passes)
+
+    def _dilate(self, mask):
+        return (((mask & self.not_last_col) << 1) | ((mask & self.not_first_col) >> 1)
+                | (mask << self.size) | (mask >> self.size)) & self.full
+
+    def _flood(self, seed, stones):
+        group = seed
+        while True:
+            grown = (self._dilate(group) & stones) | group
+            if grown == group:
+                return group
+            group = grown
+
+    def place(self, p, piece_type):
+        '''
+        在 p 落子；不能下（有子、没气、打劫）返回 -1，否则返回提了几个子
+        Place piece_type on the empty point p.
+
+        :return: the number of captured stones, or -1 (and no change) when the placement is invalid.
+        '''
+        bit = 1 << p
+        stones = self.stones
+        own = stones[piece_type] | bit
+        opp = stones[3 - piece_type]
+        empty = self.full & ~(own | opp)
+        neighbors = self.neighbors[p]
+
+        # An empty neighbor is a liberty already; only a surrounded stone needs its whole chain
+        had_liberty = neighbors & empty or self._dilate(self._flood(bit, own)) & empty
+        captured = 0
+        enemies = neighbors & opp
+        while enemies:
+            low = enemies & -enemies
+            if self.neighbors[low.bit_length() - 1] & empty:
+                enemies ^= low
+                continue
+            chain = self._flood(low, opp)
+            if not self._dilate(chain) & empty:
+                captured |= chain
+            enemies &= ~chain
+        if not had_liberty:
+            if not captured:
+                return -1
+            # KO: a capture that recreates the board before the opponent's capturing move
+            if (self.died and self.previous[piece_type] == own
+                    and self.previous[3 - piece_type] == opp & ~captured):
+                return -1
+        self.previous = stones
+        self.stones = [0, 0, 0]
+        self.stones[piece_type] = own
+        self.stones[3 - piece_type] = opp & ~captured
+        self.died = captured != 0
+        self.n_move += 1
+        self.passes = 0
+        return popcount(captured)
+
+    def play_pass(self):
+        self.previous = self.stones
+        self.n_move += 1
+        self.passes += 1
+
+    def is_eye(self, p, piece_type):
+        '''
+        四周都是自己的子（或者棋盘边）的空点，playout 里不往自己眼里填
+        Empty point surrounded by piece_type only.
+        '''
+        return not self.neighbors[p] & ~self.stones[piece_type]
+
+
+class MCTSPlayer:
+    def __init__(self, playouts=PLAYOUTS, time_limit=TIME_LIMIT, policy='puct', exploration=None, seed=None,
+                 book_path=None):
+        '''
+        蒙特卡洛树搜索的 player
+        Monte Carlo tree search player.
+
+        :param playouts: playout budget of one move.
+        :param time_limit: wall-clock budget of one move, in seconds.
+        :param policy: 'uct' (UCB1 on win rates) or 'puct' (prior-weighted, with priors that favor captures).
+        :param exploration: exploration constant; defaults to 1.4 for UCT and 1.0 for PUCT.
+        :param seed: random seed of the playouts.
+        :param book_path: opening book file (see opening_book.py), looked up before searching.
+        '''
+        self.type = 'mcts'
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.policy = policy
+        if exploration is None:
+            exploration = 1.4 if policy == 'uct' else 1.0
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.completed_playouts = 0
+        self.book = OpeningBook.load(book_path) if book_path is not None else OpeningBook()
+
+    def _expand(self, tree, node, position, piece_type):
+        '''
+        把 position 里 piece_type 所有能下的点（加上 PASS）挂到 node 下面
+        Add every legal move of piece_type, and PASS, as children of node.
+        '''
+        moves = []
+        empty = position.full & ~(position.stones[1] | position.stones[2])
+        while empty:
+            low = empty & -empty
+            empty ^= low
+            p = low.bit_length() - 1
+            trial = position.copy()
+            captured = trial.place(p, piece_type)
+            if captured < 0:
+                continue
+            # Priors: captures first, filling an own eye last
+            weight = 1.0 + 3.0 * captured
+            if position.is_eye(p, piece_type):
+                weight *= 0.1
+            moves.append((p, weight))
+        moves.append((PASS, 0.1 if moves else 1.0))
+        total = sum(weight for _, weight in moves)
+        tree.first_child[node] = len(tree)
+        tree.child_count[node] = len(moves)
+        for p, weight in moves:
+            tree.add(p, weight / total)
+
+    def _select(self, tree, node):
+        '''
+        UCT / PUCT 挑一个孩子
+        Pick the child of node to descend into.
+        '''
+        first = tree.first_child[node]
+        visits = tree.visits
+        wins = tree.wins
+        parent_visits = visits[node]
+        best = first
+        best_score = -math.inf
+        if self.policy == 'uct':
+            log_visits = math.log(max(parent_visits, 1))
+            for child in range(first, first + tree.child_count[node]):
+                if not visits[child]:
+                    return child
+                score = wins[child] / visits[child] + self.exploration * math.sqrt(log_visits / visits[child])
+                if score > best_score:
+                    best, best_score = child, score
+        else:
+            sqrt_visits = math.sqrt(max(parent_visits, 1))
+            prior = tree.prior
+            for child in range(first, first + tree.child_count[node]):
+                q = wins[child] / visits[child] if visits[child] else 0.5
+                score = q + self.exploration * prior[child] * sqrt_visits / (1 + visits[child])
+                if score > best_score:
+                    best, best_score = child, score
+        return best
+
+    def _playout(self, position, piece_type, max_move):
+        '''
+        随机下到终局：不填自己的眼，没地方下了就 PASS，两边连着 PASS 或者到了 max_move 就结束
+        Play random moves to the end of the game and return the stone counts.
+        '''
+        rng = self.rng
+        while position.passes < 2 and position.n_move < max_move:
+            empty = position.full & ~(position.stones[1] | position.stones[2])
+            points = []
+            while empty:
+                low = empty & -empty
+                empty ^= low
+                points.append(low.bit_length() - 1)
+            placed = False
+            while points:
+                k = rng.randrange(len(points))
+                p = points[k]
+                points[k] = points[-1]
+                points.pop()
+                if position.is_eye(p, piece_type):
+                    continue
+                if position.place(p, piece_type) >= 0:
+                    placed = True
+                    break
+            if not placed:
+                position.play_pass()
+            piece_type = 3 - piece_type
+        return popcount(position.stones[1]), popcount(position.stones[2])
+
+    def search(self, go, piece_type):
+        '''
+        在 go 上跑 MCTS，返回根结点的树（看访问次数挑走法）
+        Run playouts from go until the playout budget or the deadline runs out.
+
+        :param go: Go instance.
+        :param piece_type: 1('X') or 2('O'), the side to move.
+        :return: the tree; the children of node 0 are the root moves.
+        '''
+        root = _Position.from_go(go)
+        max_move = go.max_move
+        komi = go.komi
+
+        tree = _Tree()
+        tree.add(PASS, 1.0)
+        if root.passes < 2 and root.n_move < max_move:
+            self._expand(tree, 0, root, piece_type)
+        deadline = time.time() + self.time_limit
+        self.completed_playouts = 0
+        while self.completed_playouts < self.playouts:
+            if not self.completed_playouts % 64 and time.time() >= deadline:
+                break
+            position = root.copy()
+            to_move = piece_type
+            node = 0
+            path = [0]
+            # Selection: walk down the expanded part of the tree
+            while tree.first_child[node] >= 0 and position.passes < 2 and position.n_move < max_move:
+                node = self._select(tree, node)
+                move = tree.move[node]
+                if move == PASS:
+                    position.play_pass()
+                else:
+                    position.place(move, to_move)
+                to_move = 3 - to_move
+                path.append(node)
+            # Expansion of a leaf that is not the end of the game
+            if position.passes < 2 and position.n_move < max_move and tree.visits[node] > 0:
+                self._expand(tree, node, position, to_move)
+                node = self._select(tree, node)
+                move = tree.move[node]
+                if move == PASS:
+                    position.play_pass()
+                else:
+                    position.place(move, to_move)
+                to_move = 3 - to_move
+                path.append(node)
+            black, white = self._playout(position, to_move, max_move)
+            if black > white + komi:
+                winner = 1
+            elif black < white + komi:
+                winner = 2
+            else:
+                winner = 0
+            # Backpropagation: node k holds the wins of the player who moved into it
+            mover = piece_type if len(path) % 2 == 0 else 3 - piece_type
+            for k in reversed(path):
+                tree.visits[k] += 1
+                if winner == mover:
+                    tree.wins[k] += 1.0
+                elif winner == 0:
+                    tree.wins[k] += 0.5
+                mover = 3 - mover
+            self.completed_playouts += 1
+        return tree
+
+    def get_input(self, go, piece_type):
+        '''
+        开局库里有就直接出棋，不然是访问次数最多的那一手
+        The opening book reply if there is one, else the most visited root move.
+        '''
+        move = self.book.lookup(go, piece_type)
+        if move is not None and (move == "PASS" or go.valid_place_check(move[0], move[1], piece_type, test_check=True)):
+            return move
+        tree = self.search(go, piece_type)
+        first = tree.first_child[0]
+        if first < 0:
+            return "PASS"
+        best = max(range(first, first + tree.child_count[0]), key=lambda child: tree.visits[child])
+        move = tree.move[best]
+        if move == PASS:
+            return "PASS"
+        return divmod(move, go.size)
+
+
+if __name__ == "__main__":
+    n = 5
+    piece_type, previous_board, board = readInput(n)
+    go = GO(n)
+    go.set_board(piece_type, previous_board, board)
+    # Playouts end at max_move, so they need the move index the input does not carry
+    start = time.time()
+    clock = MoveClock(CLOCK_PATH.format(piece_type), max_move_time=TIME_LIMIT)
+    clock.start(go, piece_type)
+    player = MCTSPlayer(time_limit=clock.budget(go, piece_type), book_path=BOOK_PATH)
+    action = player.get_input(go, piece_type)
+    writeOutput(action)
+    clock.finish(go, piece_type, action, time.time() - start)
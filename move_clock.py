@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: move_clock
+# Description: 第几手和时间：input.txt 里没有手数，每一手结束的时候记下自己下完以后的棋盘和手数，下一手对上了就接着数，
+#              对不上（新的一局）就按棋盘上的子数估；整局的思考时间按剩下的每一手能下的点数分
+# TodoList:
+
+import math
+
+GAME_TIME = 60.0  # thinking time of one side for the whole game, in seconds
+MIN_MOVE_TIME = 1.0  # no move gets less than this, even when the game budget is spent
+# One file per color: when a program plays itself both sides share the directory
+CLOCK_PATH = 'move_clock{}.txt'
+
+
+def estimate_move_index(go, piece_type):
+    '''
+    没有记录的时候估手数：每下一个子多一手，黑棋下的时候是偶数，白棋是奇数；
+    提掉的子和 PASS 看不出来，所以只会估少
+    Estimate the moves played so far from the board alone: one move per stone on the board,
+    rounded up to the parity of the side to move (black moves at even indices). Captures and
+    passes leave no trace, so this never overestimates.
+    '''
+    n_move = go.score(1) + go.score(2)
+    if n_move % 2 != piece_type - 1:
+        n_move += 1
+    return n_move
+
+
+class MoveClock:
+    def __init__(self, path=None, game_time=GAME_TIME, max_move_time=None):
+        '''
+        一局棋的手数和用时，存在一个小文本文件里，每一手都是新进程也能接着数
+        Move index and time used of one side in the current game, kept in a small text file so
+        that every move, a new process, carries on from the previous one.
+
+        :param path: the clock file; None keeps nothing between moves.
+        :param game_time: thinking time of the whole game, in seconds.
+        :param max_move_time: upper bound of one move, in seconds (the per-move limit of the grader).
+        '''
+        self.path = path
+        self.game_time = game_time
+        self.max_move_time = math.inf if max_move_time is None else max_move_time
+        self.time_used = 0.0
+        self.n_move = 0
+        self.saved_move = None  # (n_move after our last move, board after it) read from the file
+
+    def load(self):
+        '''
+        读文件：三行，下完上一手以后的手数、这一局用了多少秒、那时候的棋盘（n*n 个数字）
+        Read the clock file; a missing or broken file is a new game.
+        '''
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.read().split()
+            n_move, time_used, board = int(lines[0]), float(lines[1]), lines[2]
+        except (OSError, ValueError, IndexError):
+            return
+        self.saved_move = (n_move, board)
+        self.time_used = time_used
+
+    def start(self, go, piece_type):
+        '''
+        这一手开始：上一手下完的棋盘就是这一手的 previous_board 的话，手数是上次的加一，
+        不然就是新的一局，手数按子数估，用时清零；算出来的手数写进 go.n_move
+        Find the index of this move and set go.n_move to it. The input's previous board is the
+        board our last move left when we are in the same game; otherwise a new game has started.
+
+        :return: the move index, the number of moves played so far.
+        '''
+        self.load()
+        n = go.size
+        previous = ''.join(str(go.previous_board[i][j]) for i in range(n) for j in range(n))
+        if self.saved_move is not None and self.saved_move[1] == previous and self.saved_move[0] < go.max_move:
+            self.n_move = self.saved_move[0] + 1
+        else:
+            self.n_move = estimate_move_index(go, piece_type)
+            self.time_used = 0.0
+        go.n_move = self.n_move
+        return self.n_move
+
+    def remaining_moves(self, go):
+        '''
+        到 max_move 为止自己还要下几手（包括这一手）
+        Moves of the side to move left before max_move, this one included.
+        '''
+        return max((go.max_move - go.n_move + 1) // 2, 1)
+
+    def budget(self, go, piece_type):
+        '''
+        这一手的时间：剩下的整局时间按宽度分，这一手的宽度是现在能下的点数，
+        以后每一手少两个点（每一手棋都占掉一个点）；宽的局面多给，但不超过每一手的上限
+        Time of this move. The rest of the game budget is shared among the remaining moves in
+        proportion to their width: the legal moves now, and two points fewer for each later move
+        of ours, since every move fills a point.
+
+        :return: seconds, between MIN_MOVE_TIME and max_move_time.
+        '''
+        width = max(len(go.legal_moves(piece_type)), 1)
+        widths = [max(width - 2 * k, 1) for k in range(self.remaining_moves(go))]
+        share = width / sum(widths)
+        seconds = max(self.game_time - self.time_used, 0.0) * share
+        return min(max(seconds, MIN_MOVE_TIME), self.max_move_time)
+
+    def finish(self, go, piece_type, action, seconds):
+        '''
+        这一手下完：记下下完以后的棋盘、手数和用时
+        Record the board after our move, the move index after it and the time spent.
+
+        :param go: Go instance of this move, before action.
+        :param action: the move played, (i, j) or "PASS".
+        :param seconds: thinking time of this move.
+        '''
+        self.time_used += seconds
+        if self.path is None:
+            return
+        after = go.clone()
+        if action == "PASS":
+            after.play_pass()
+        else:
+            after.play(action[0], action[1], piece_type)
+        n = go.size
+        board = ''.join(str(after.board[i][j]) for i in range(n) for j in range(n))
+        try:
+            with open(self.path, 'w') as f:
+                f.write('{}\n{:.3f}\n{}\n'.format(self.n_move + 1, self.time_used, board))
+        except OSError:
+            pass  # read-only directory: the next move estimates its index from the board
@@ -18,9 +18,6 @@ class MinMaxPlayer:
     def retrieve_from_transposition_table(self, board_hash):
         return self.transposition_table.get(board_hash, None)
 
-    def board_to_hash(self, board):
-        return str(board)
-
     def order_moves(self, go, piece_type):
         def heuristic(move):
             new_go = deepcopy(go)
@@ -212,7 +209,7 @@ class MinMaxPlayer:
             max_eval = math.inf
 
         # Transposition Table Retrieval
-        current_hash = self.board_to_hash(go.board)
+        current_hash = go.zobrist_key(piece_type)
         cached_result = self.retrieve_from_transposition_table(current_hash)
         if cached_result:
             return cached_result
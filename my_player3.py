@@ -1,299 +1,602 @@
 import math
+import multiprocessing
+import os
 import time
-from copy import deepcopy
 from read import readInput
 from write import writeOutput
-from host import GO
+from evaluation import (BONUS_WEIGHTS, MATERIAL_WEIGHTS, SHAPE_WEIGHTS, SWAPPED, EvaluationCache,
+                        IncrementalEvaluator, cached_features, shape_features, weighted)
+from endgame import LOSS, EndgameSolver, SolverTimeout, empty_count, move_index, opponent_passed
+from host import GO, ZOBRIST_SEED
+from move_clock import CLOCK_PATH, MoveClock
+from opening_book import BOOK_PATH, OpeningBook
+from search_stats import CountingGO, SearchStats
+from symmetry import restore_move, transform_move
+from transposition import EXACT, LOWER, UPPER, NO_MOVE, TranspositionTable
+
+try:
+    import numpy as np
+    from batch_go import child_features
+except ImportError:
+    np = None  # no NumPy: the root is ordered without the one-ply lookahead
+
+WORKERS = 1  # processes of the root-parallel search; 1 searches serially
+TIME_LIMIT = 8.0  # seconds per move, under the grader's 10 s with room for start-up and I/O
+ASPIRATION_WINDOW = 6  # half width of the root window around the previous iteration's score
+QUIESCENCE_NODES = 8  # capture / escape nodes one horizon node may add
+KILLER_SLOTS = 2  # killer moves kept per ply
+EVAL_CACHE_SIZE = 1 << 16  # feature vectors kept by the evaluation cache, about 300 bytes each
+NULL_WINDOW = 0.5  # width of the zero window; scores move in steps of 0.5 (the +-2.5 of evaluate_board)
+# The exact solver takes over when this few moves or empty points are left, with a share of the time
+ENDGAME_MOVES = 10
+ENDGAME_EMPTY = 5
+ENDGAME_TIME_SHARE = 0.5
+# Opt-in search statistics: set this environment variable to a file to get one JSON line per move
+STATS_PATH = os.environ.get('MY_PLAYER3_STATS')
+# Every move is a new process: the table lives in a file, one per color since values are from the searcher's view
+TABLE_PATH = 'transposition{}.bin'
+
+
+class SearchTimeout(Exception):
+    '''
+    这一手的时间用完了，中途退出搜索
+    Raised inside the search when the deadline of the move has passed.
+    '''
 
 
 class MinMaxPlayer:
-    def __init__(self):
+    def __init__(self, time_limit=TIME_LIMIT, max_depth=24, table_path=None, workers=1, book_path=None,
+                 stats_path=None):
         self.move_order = [[2, 2], [1, 1], [1, 3], [0, 2], [3, 3], [2, 4], [3, 1], [4, 2], [2, 0],
                            [0, 0], [0, 1], [2, 3], [0, 3], [0, 4], [1, 4], [2, 1], [3, 4], [4, 4],
                            [4, 3], [1, 0], [4, 1], [4, 0], [3, 0], [1, 2], [3, 2]]
-        self.transposition_table = {}
-        self.zobrist_table = self.init_zobrist()
+        self.transposition_table = TranspositionTable()
+        if table_path is not None:
+            try:
+                self.transposition_table = TranspositionTable.open(table_path, key_tag=ZOBRIST_SEED * 100 + 5)
+            except (OSError, ValueError):
+                pass  # no usable file (read-only directory, ...): search with a table in memory
+        self.book = OpeningBook.load(book_path) if book_path is not None else OpeningBook()
+        self.use_symmetry = True
+        self.endgame_solver = EndgameSolver()
+        self.stats = SearchStats(stats_path) if stats_path is not None else None
+        self.time_limit = time_limit  # wall-clock budget of one get_input call
+        self.max_depth = max_depth  # the deepest iteration of iterative deepening
+        self.search_depth = 3  # depth of the current iteration, in plies
+        self.deadline = None
+        self.completed_depth = 0
+        self.nodes = 0
+        # Move ordering state: rank of every point in move_order, killer moves per ply, history per color
+        self.move_rank = [0] * 25
+        for rank, (i, j) in enumerate(self.move_order):
+            self.move_rank[i * 5 + j] = rank
+        self.killers = [[] for _ in range(max_depth + 2)]
+        self.history = [[0] * 25 for _ in range(3)]
+        self.root_scores = None  # lookahead_scores of the root of the current search
+        self.ordering_time = 0.0
+        self.quiescence_left = 0
+        self.quiescence_nodes = 0
+        # Features of the searched board, updated move by move instead of recomputed at every leaf,
+        # and a bounded cache of the features of positions reached again by transposition
+        self.evaluation_cache = EvaluationCache(EVAL_CACHE_SIZE)
+        self.evaluator = IncrementalEvaluator(self.evaluation_cache)
+        # Root-parallel search, only worth it with more than one core
+        self.workers = workers if (os.cpu_count() or 1) > 1 else 1
+        self.pool = None
+        self.shared_alpha = None
 
     def opponent(self, piece_type):
         return 3 - piece_type
 
-    def init_zobrist(self):
-        import random
-        table = {}
-        for i in range(5):
-            for j in range(5):
-                for k in [1, 2]:
-                    table[(i, j, k)] = random.getrandbits(64)
-        return table
-
-    def compute_hash(self, board):
-        h = 0
-        for i in range(5):
-            for j in range(5):
-                if board[i][j] != 0:
-                    h ^= self.zobrist_table[(i, j, board[i][j])]
-        return h
-
-    def heuristic_move_order(self, go, piece_type):
-        moves_heuristic = {}
-
-        for move in self.move_order:
-            if go.valid_place_check(*move, piece_type):
-                heuristic_val = self.calculate_heuristic(go, move, piece_type)
-                moves_heuristic[tuple(move)] = heuristic_val
-
-        sorted_moves = sorted(moves_heuristic, key=moves_heuristic.get, reverse=True)
-
-        return sorted_moves
-
-    def calculate_heuristic(self, go, move, piece_type):
-        new_go = deepcopy(go)
-        new_go.place_chess(*move, piece_type)
-        new_go.remove_died_pieces(self.opponent(piece_type))
-        heuristic_val = self.evaluate_board(new_go, 0, piece_type)
-
-        # heuristic_val -= self.distance_to_center(*move)
-        heuristic_val += self.check_aggressive_shapes(new_go.board, *move)
-        heuristic_val -= self.check_defensive_shapes(new_go.board, *move)
-
-        if piece_type == 1:
-            factor = 1
-        else:
-            factor = 1
-        # Aggressive move heuristic
-        opp_liberties_before = self.total_chain_liberties(go.board, self.opponent(piece_type))
-        opp_liberties_after = self.total_chain_liberties(new_go.board, self.opponent(piece_type))
-        heuristic_val += (opp_liberties_before - opp_liberties_after) * factor
-        my_liberties_before = self.total_chain_liberties(go.board, piece_type)
-        my_liberties_after = self.total_chain_liberties(new_go.board, piece_type)
-        heuristic_val += (my_liberties_after - my_liberties_before) * factor
-        return heuristic_val
-
-
-
-    def distance_to_center(self, i, j):
-        center = 2
-        return abs(i - center) + abs(j - center)
-
-    def check_aggressive_shapes(self, board, i, j):
-        if 0 <= i + 2 < 5:
-            if board[i + 1][j] == 1 and board[i + 2][j] == 1:
-                return 1
-        if 0 <= j + 2 < 5:
-            if board[i][j + 1] == 1 and board[i][j + 2] == 1:
-                return 1
-        return 0
-
-    def check_defensive_shapes(self, board, i, j):
-        liberties = 0
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            if 0 <= i + dx < 5 and 0 <= j + dy < 5:
-                if board[i + dx][j + dy] == 0:
-                    liberties += 1
-        if liberties == 1:
-            return 1
-        return 0
-
-    def is_eye_shape(self, board, i, j, piece_type):
-        if board[i][j] != 0:
-            return False
-
-        for x, y in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + x, j + y
-            if 0 <= ni < 5 and 0 <= nj < 5 and board[ni][nj] != piece_type:
-                return False
-        return True
-
+    def order_moves(self, go, piece_type, depth, hash_move):
+        '''
+        不落子的走法排序：置换表的最佳走法，提子和逃出叫吃，这一层的杀手走法，历史表，最后按 move_order 的顺序
+        Order the legal moves without playing any of them: the hash move, then captures and atari
+        escapes (from GO.legal_moves), then the killer moves of this ply, then the history table,
+        with move_order breaking ties. At the root the quiet moves go by their one-ply lookahead
+        score (root_scores) before the history table.
+
+        :param go: Go instance.
+        :param piece_type: 1('X') or 2('O'), the side to move.
+        :param depth: ply from the root.
+        :param hash_move: best move stored in the transposition table, or None.
+        :return: a list of (i, j), best first.
+        '''
+        start = time.time()
+        killers = self.killers[depth]
+        history = self.history[piece_type]
+        lookahead = self.root_scores if depth == 1 else None
+        scored = []
+        for move in go.legal_moves(piece_type):
+            point = (move.i, move.j)
+            p = move.i * go.size + move.j
+            if point == hash_move:
+                key = (3, 0)
+            elif move.captured or move.rescued:
+                key = (2, len(move.captured) + move.rescued)
+            elif point in killers:
+                key = (1, -killers.index(point))
+            elif lookahead is not None:
+                key = (0, lookahead[p], history[p])
+            else:
+                key = (0, history[p])
+            scored.append((key, -self.move_rank[p], point))
+        scored.sort(reverse=True)
+        self.ordering_time += time.time() - start
+        return [point for _, _, point in scored]
+
+    def update_ordering(self, piece_type, move, depth, remaining):
+        '''
+        一手不提子的棋造成了剪枝：记成这一层的杀手走法，历史表加 remaining 的平方
+        Remember a quiet move that caused a beta cutoff.
+        '''
+        killers = self.killers[depth]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLER_SLOTS:]
+        self.history[piece_type][move[0] * 5 + move[1]] += remaining * remaining
 
     def evaluate_shape(self, board, piece_type):
-        score = 0
-        patterns = {
-            "live_four": [[piece_type, piece_type, piece_type, piece_type, 0]],
-            "dead_four": [[self.opponent(piece_type), piece_type, piece_type, piece_type, 0]],
-            "live_three": [[piece_type, piece_type, piece_type, 0, 0]],
-        }
-
-        pattern_scores = {
-            "live_four": 3,
-            "dead_four": -1,
-            "live_three": 2,
-        }
-
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if self.is_eye_shape(board, i, j, piece_type):
-                    score += 4
-                for pattern_name, pattern in patterns.items():
-                    if self.match_pattern(board, i, j, pattern):
-                        score += pattern_scores[pattern_name]
-
-        return score
-
-    def match_pattern(self, board, x, y, pattern):
-        if x + len(pattern) > len(board) or y + len(pattern[0]) > len(board[0]):
-            return False
-
-        for i in range(len(pattern)):
-            for j in range(len(pattern[0])):
-                if pattern[i][j] != 0 and pattern[i][j] != board[x + i][y + j]:
-                    return False
-        return True
+        '''
+        棋形分：眼 4，活四 3，死四 -1，活三 2；棋形编译成表（evaluation.py 的 EYE_PATTERNS、ROW_PATTERNS），行上的棋形四个方向都读，每个点查一次
+        Shape score of piece_type: one lookup per point and direction in the compiled pattern tables.
+        '''
+        n = len(board)
+        black = white = 0
+        for i, row in enumerate(board):
+            for j, piece in enumerate(row):
+                if piece == 1:
+                    black |= 1 << (i * n + j)
+                elif piece == 2:
+                    white |= 1 << (i * n + j)
+        vector = shape_features(black, white, n)
+        if piece_type == 2:
+            vector = [vector[k] for k in SWAPPED]
+        return weighted(SHAPE_WEIGHTS, vector)
+
+    def board_features(self, go, piece_type):
+        '''
+        搜索中的棋盘用增量的特征，别的棋盘从头算
+        Features of go from the view of piece_type: incremental for the board being searched.
+        '''
+        if go is self.evaluator.go:
+            return self.evaluator.features(piece_type)
+        return cached_features(go, piece_type, self.evaluation_cache)
 
     def evaluate_board(self, go, cur_player, piece_type):
-        base_score = go.score(piece_type) - go.score(self.opponent(piece_type))
+        '''
+        叶子的估值：子数差，加上按颜色定正负的棋形分（特征向量见 evaluation.py）
+        Leaf score: the stone difference plus the shape score, signed by color.
+        '''
+        vector = self.board_features(go, piece_type)
         sign_modifier = 1 if piece_type == 1 else -1
         base_modifier = -2.5 if cur_player == 0 else 2.5
-        score = base_score + sign_modifier * base_modifier
-        score += sign_modifier * self.evaluate_shape(go.board, piece_type)
-        return score
-
-    def count_liberties(self, board, i, j, piece_type, visited=None):
-        if visited is None:
-            visited = set()
-
-        if not self.is_valid_position(i, j) or (i, j) in visited:
-            return 0
-
-        if board[i][j] == 0:
-            return 1
-
-        if board[i][j] == self.opponent(piece_type):
-            return 0
-
-        visited.add((i, j))
-
-        neighbors = [(i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)]
-        total_liberties = sum(self.count_liberties(board, x, y, piece_type, visited) for x, y in neighbors)
-
-        return total_liberties
-
-    def is_valid_position(self, i, j):
-        return 0 <= i < 5 and 0 <= j < 5
-
-    def get_chain_liberties(self, board, i, j, visited=None):
-        if visited is None:
-            visited = set()
-
-        if (i, j) in visited or board[i][j] == 0:
-            return set()
-
-        visited.add((i, j))
-        piece_type = board[i][j]
-        liberties = set()
-
-        for x, y in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            ni, nj = i + x, j + y
-            if 0 <= ni < 5 and 0 <= nj < 5:
-                if board[ni][nj] == 0:
-                    liberties.add((ni, nj))
-                elif board[ni][nj] == piece_type:
-                    liberties |= self.get_chain_liberties(board, ni, nj, visited)
-
-        return liberties
-
-    def total_chain_liberties(self, board, piece_type):
-        visited = set()
-        total_liberties = 0
-
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if board[i][j] == piece_type and (i, j) not in visited:
-                    chain_liberties = self.get_chain_liberties(board, i, j, set())
-                    total_liberties += len(chain_liberties)
-                    visited.update(chain_liberties)
-
-        return total_liberties
-
-
-    def all_chain_liberties(self, board, piece_type):
-        visited = set()
-        chains_liberties = {}
-
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if board[i][j] == piece_type and (i, j) not in visited:
-                    chain_liberties = self.get_chain_liberties(board, i, j, set())
-                    chains_liberties[(i, j)] = len(chain_liberties)
-                    visited.update(chain_liberties)
-
-        return chains_liberties
-
-    def pieces_with_one_liberty(self, board, piece_type):
-        visited = set()
-        count = 0
-
-        for i, row in enumerate(board):
-            for j, piece in enumerate(row):
-                position = (i, j)
-
-                if piece == piece_type and position not in visited:
-                    if self.count_liberties(board, i, j, piece_type, set()) == 1:
-                        count += 1
-                        visited.add(position)
-
-        return count
-
-
-    def min_max_ab_pruning(self, go, cur_player, piece_type, alpha, beta, depth):
-        board_hash = self.compute_hash(go.board)
-        if board_hash in self.transposition_table:
-            stored_value, stored_depth = self.transposition_table[board_hash]
-            if stored_depth >= depth:
-                return [None, stored_value]
+        return weighted(MATERIAL_WEIGHTS, vector) + sign_modifier * (base_modifier + weighted(SHAPE_WEIGHTS, vector))
 
+    def move_bonus(self, go, piece_type, captured_pieces_count):
+        '''
+        刚下完一手以后，这一手给下棋的一方加的分：提子、自己的危险子、气的差、子数的差
+        Score the side that just moved earns on the board after its move.
+        '''
         if piece_type == 1:
             factor = 8
             # be_factor = 3
         else:
             factor = 3
             # be_factor = 3
+        return factor * captured_pieces_count + weighted(BONUS_WEIGHTS, self.board_features(go, piece_type))
+
+    def negamax(self, go, cur_player, piece_type, alpha, beta, depth):
+        '''
+        negamax + PVS：值都是轮到下的一方（piece_type）的角度；第一手全窗口，后面的先用零窗口试，比 alpha 好再重搜
+        Principal variation search. Values are from the view of piece_type, the side to move.
+
+        :param go: Go instance, played on and restored with play/undo.
+        :param cur_player: 0 when piece_type is the player of get_input, 1 for the opponent (for evaluate_board).
+        :param piece_type: 1('X') or 2('O'), the side to move.
+        :param alpha: lower bound of the window.
+        :param beta: upper bound of the window.
+        :param depth: ply from the root, starting at 1.
+        :return: (best move or None, fail-soft value).
+        '''
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchTimeout()
+        self.nodes += 1
+        if self.stats is not None:
+            self.stats.node(depth)
+
+        # Symmetric positions share one entry (every evaluation term is the same under the board symmetries);
+        # the stored move is kept in the canonical frame.
+        # Entries keep the remaining depth, so they stay valid from one iteration to the next
+        remaining = self.search_depth - depth + 1
+        hash_move = None
+        if self.use_symmetry:
+            board_hash, symmetry = go.canonical_key(piece_type)
+        else:
+            board_hash, symmetry = go.zobrist_key(piece_type), 0
+        alpha_orig, beta_orig = alpha, beta
+        entry = self.transposition_table.probe(board_hash)
+        if entry is not None:
+            stored_value, stored_depth, stored_flag, stored_move = entry
+            if stored_move != NO_MOVE:
+                hash_move = restore_move(divmod(stored_move, go.size), symmetry, go.size)
+            if stored_depth >= remaining:
+                if stored_flag == EXACT:
+                    return hash_move, stored_value
+                if stored_flag == LOWER:
+                    alpha = max(alpha, stored_value)
+                else:
+                    beta = min(beta, stored_value)
+                if alpha >= beta:
+                    return hash_move, stored_value
 
-        if depth > 3:
-            return [None, self.evaluate_board(go, cur_player, piece_type)]
+        if depth > self.search_depth:
+            self.quiescence_left = QUIESCENCE_NODES
+            return None, self.quiescence(go, cur_player, piece_type, alpha, beta)
 
         best_move = None
-        if cur_player == 0:
-            max_eval = -math.inf
+        best_value = -math.inf
+
+        # One mutable board for the whole tree: play the move, search, then undo it
+        for index, move in enumerate(self.order_moves(go, piece_type, depth, hash_move)):
+            record = self.evaluator.play(go, move[0], move[1], piece_type)
+            if record is None:
+                continue
+            captured_pieces_count = len(go.died_pieces)
+            bonus = self.move_bonus(go, piece_type, captured_pieces_count)
+            # value = bonus - child value, so the window of the child is shifted by the bonus
+            if best_value == -math.inf:
+                _, score = self.negamax(go, 1 - cur_player, self.opponent(piece_type),
+                                        bonus - beta, bonus - alpha, depth + 1)
+                value = bonus - score
+            else:
+                _, score = self.negamax(go, 1 - cur_player, self.opponent(piece_type),
+                                        bonus - alpha - NULL_WINDOW, bonus - alpha, depth + 1)
+                value = bonus - score
+                if alpha < value < beta:
+                    # Fail high on the null window: this move may be the new best, search it exactly
+                    _, score = self.negamax(go, 1 - cur_player, self.opponent(piece_type),
+                                            bonus - beta, bonus - value, depth + 1)
+                    value = bonus - score
+            self.evaluator.undo(go, record)
+
+            if value > best_value:
+                best_value, best_move = value, move
+                alpha = max(alpha, value)
+            if alpha >= beta:
+                if not captured_pieces_count:
+                    self.update_ordering(piece_type, move, depth, remaining)
+                if self.stats is not None:
+                    self.stats.cutoff(index)
+                break
+
+        # Fail-soft bounds: a value outside the window only bounds the true value
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta_orig:
+            flag = LOWER
         else:
-            max_eval = math.inf
-
-        for move in self.heuristic_move_order(go, piece_type):
-            if go.valid_place_check(*move, piece_type):
-                new_go = deepcopy(go)
-                new_go.place_chess(*move, piece_type)
-                captured_pieces_count = len(new_go.remove_died_pieces(self.opponent(piece_type)))
-                # be_captured_pieces_count = len(new_go.remove_died_pieces(piece_type))
-                _, score = self.min_max_ab_pruning(new_go, 1 - cur_player, self.opponent(piece_type), alpha, beta, depth + 1)
-                threatened_pieces_score = 2 * self.pieces_with_one_liberty(new_go.board, piece_type)
-                opponent_threatened_pieces_score = 0 * self.pieces_with_one_liberty(new_go.board, self.opponent(piece_type))
-                my_chain_liberties = self.total_chain_liberties(new_go.board, piece_type)
-                opp_chain_liberties = self.total_chain_liberties(new_go.board, self.opponent(piece_type))
-                chain_liberties_diff = my_chain_liberties - opp_chain_liberties
-                if cur_player == 0:
-                    final_score = score + factor * captured_pieces_count - threatened_pieces_score + opponent_threatened_pieces_score + chain_liberties_diff * 3 + new_go.score(
-                        piece_type) - new_go.score(self.opponent(piece_type))
-                    if final_score > max_eval:
-                        max_eval, best_move = final_score, move
-                        alpha = max(alpha, final_score)
+            flag = EXACT
+        stored_move = NO_MOVE
+        if best_move is not None:
+            i, j = transform_move(best_move, symmetry, go.size)
+            stored_move = i * go.size + j
+        self.transposition_table.store(board_hash, best_value, remaining, flag, stored_move)
+
+        return best_move, best_value
+
+    def quiescence(self, go, cur_player, piece_type, alpha, beta):
+        '''
+        到了搜索深度以后，只接着下提子和逃出叫吃的棋（对手自己送进叫吃的子也就是被提掉），直到局面安静，
+        每个叶子最多再搜 QUIESCENCE_NODES 个结点
+        Quiescence search at the horizon: only captures and atari escapes are extended (capturing a
+        stone the opponent put in self-atari is a capture), until the position is quiet or the node
+        budget of the horizon node (quiescence_left) runs out.
+
+        :return: fail-soft value from the view of piece_type.
+        '''
+        # evaluate_board scores for the player of get_input
+        value = self.evaluate_board(go, cur_player, piece_type)
+        if self.stats is not None:
+            self.stats.evaluation()
+        stand_pat = value if cur_player == 0 else -value
+        if stand_pat >= beta or self.quiescence_left <= 0 or go.n_move >= go.max_move:
+            return stand_pat
+        best_value = stand_pat
+        alpha = max(alpha, stand_pat)
+        tactical = [move for move in go.legal_moves(piece_type) if move.captured or move.rescued]
+        tactical.sort(key=lambda move: len(move.captured) + move.rescued, reverse=True)
+        for move in tactical:
+            if self.quiescence_left <= 0:
+                break
+            self.quiescence_left -= 1
+            self.quiescence_nodes += 1
+            record = self.evaluator.play(go, move.i, move.j, piece_type)
+            bonus = self.move_bonus(go, piece_type, len(move.captured))
+            value = bonus - self.quiescence(go, 1 - cur_player, self.opponent(piece_type), bonus - beta, bonus - alpha)
+            self.evaluator.undo(go, record)
+            if value > best_value:
+                best_value = value
+                alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best_value
+
+    def search_root(self, go, piece_type, guess):
+        '''
+        期望窗口：在上一层的分数附近开一个窄窗口，超出了就把那一边放开重搜
+        Aspiration search of the root: a narrow window around the score of the previous
+        iteration, widened on the failing side until the value falls inside.
+
+        :param go: Go instance.
+        :param piece_type: 1('X') or 2('O').
+        :param guess: score of the previous iteration, or None for a full window.
+        :return: (best move, value).
+        '''
+        if guess is None or math.isinf(guess):
+            return self.negamax(go, 0, piece_type, -math.inf, math.inf, 1)
+        alpha, beta = guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW
+        while True:
+            move, value = self.negamax(go, 0, piece_type, alpha, beta, 1)
+            if value <= alpha:
+                alpha = -math.inf
+            elif value >= beta:
+                beta = math.inf
+            else:
+                return move, value
+
+    def search_root_move(self, go, piece_type, move):
+        '''
+        根节点的一手（并行搜索里每个进程做的事）：alpha 从共享内存里读，比它好就写回去
+        Search one root move against the alpha bound shared by all processes, and raise that
+        bound when the move beats it.
+
+        :param go: Go instance, the root position; the move is played on it and undone.
+        :param piece_type: 1('X') or 2('O'), the side to move at the root.
+        :param move: the root move (i, j).
+        :return: the value of the move; at most the shared alpha when it is not the best one.
+        '''
+        opponent = self.opponent(piece_type)
+        self.evaluator.reset(go)
+        record = self.evaluator.play(go, move[0], move[1], piece_type)
+        try:
+            bonus = self.move_bonus(go, piece_type, len(go.died_pieces))
+            alpha = self.shared_alpha.value
+            if alpha == -math.inf:
+                _, score = self.negamax(go, 1, opponent, -math.inf, math.inf, 2)
+                value = bonus - score
+            else:
+                _, score = self.negamax(go, 1, opponent, bonus - alpha - NULL_WINDOW, bonus - alpha, 2)
+                value = bonus - score
+                if value > alpha:
+                    _, score = self.negamax(go, 1, opponent, -math.inf, bonus - value, 2)
+                    value = bonus - score
+        finally:
+            self.evaluator.undo(go, record)
+        with self.shared_alpha.get_lock():
+            if value > self.shared_alpha.value:
+                self.shared_alpha.value = value
+        return value
+
+    def search_root_parallel(self, go, piece_type, guess_move):
+        '''
+        根节点并行：第一手自己搜，定下 alpha，剩下的分给进程池，alpha 通过共享内存互相传
+        Root-parallel search: the first move is searched here to set alpha, the other root moves
+        go to the pool with alpha shared through shared memory.
+
+        :param go: Go instance.
+        :param piece_type: 1('X') or 2('O').
+        :param guess_move: best move of the previous iteration, searched first.
+        :return: (best move, value); raises SearchTimeout when the iteration did not finish.
+        '''
+        moves = self.order_moves(go, piece_type, 1, guess_move)
+        if not moves:
+            return None, -math.inf
+        self.shared_alpha.value = -math.inf
+        best_move, best_value = moves[0], self.search_root_move(go.clone(), piece_type, moves[0])
+        tasks = [(go, piece_type, move, self.search_depth, self.deadline) for move in moves[1:]]
+        pending = self.pool.map_async(_search_root_move, tasks, chunksize=1)
+        timeout = None if math.isinf(self.deadline) else max(self.deadline - time.time(), 0) + 0.05
+        try:
+            results = pending.get(timeout)
+        except multiprocessing.TimeoutError:
+            raise SearchTimeout()
+        for move, value, nodes in results:
+            if value is None:
+                raise SearchTimeout()
+            self.nodes += nodes
+            if value > best_value:
+                best_move, best_value = move, value
+        return best_move, best_value
+
+    def iterative_deepening(self, go, piece_type):
+        '''
+        从 1 层开始一层一层往下搜，时间到了就停，返回最后一次搜完的那层的最佳走法
+        Search depth 1, 2, ... until max_depth or the deadline, reusing the transposition
+        table (and so the previous best moves) between iterations. Plies past max_move cannot be
+        played, so the iterations stop at the end of the game (go.n_move must be the move index).
+
+        :param go: Go instance, searched on a clone so an abandoned iteration leaves it untouched.
+        :param piece_type: 1('X') or 2('O').
+        :return: the best move of the deepest completed iteration, or None.
+        '''
+        best_move = None
+        value = None
+        self.completed_depth = 0
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.ordering_time = 0.0
+        self.killers = [[] for _ in range(self.max_depth + 2)]
+        for history in self.history:
+            history[:] = [score // 2 for score in history]
+        self.root_scores = self.lookahead_scores(go, piece_type)
+        max_depth = max(min(self.max_depth, go.max_move - go.n_move), 1)
+        for search_depth in range(1, max_depth + 1):
+            self.search_depth = search_depth
+            nodes = self.nodes
+            if self.stats is not None:
+                self.stats.start_iteration()
+            try:
+                if self.pool is not None:
+                    move, value = self.search_root_parallel(go, piece_type, best_move)
                 else:
-                    final_score = score - factor * captured_pieces_count + threatened_pieces_score - opponent_threatened_pieces_score - chain_liberties_diff * 3 + new_go.score(
-                        self.opponent(piece_type)) - new_go.score(piece_type)
-                    if final_score < max_eval:
-                        max_eval, best_move = final_score, move
-                        beta = min(beta, final_score)
+                    root = go.clone() if self.stats is None else CountingGO.wrap(go)
+                    self.evaluator.reset(root)
+                    move, value = self.search_root(root, piece_type, value)
+            except SearchTimeout:
+                if self.stats is not None:
+                    self.stats.end_iteration(search_depth, self.nodes - nodes, False)
+                break
+            if self.stats is not None:
+                self.stats.end_iteration(search_depth, self.nodes - nodes, True)
+            best_move = move
+            self.completed_depth = search_depth
+            if move is None:
+                break
+        return best_move
+
+    def close(self):
+        '''
+        把文件里的置换表写回去
+        Write the file-backed transposition table back.
+        '''
+        self.transposition_table.close()
+
+    def book_move(self, go, piece_type):
+        '''
+        开局库里有这个局面就直接出棋，不用搜
+        The opening book reply, or None when the position is not in the book.
+        '''
+        move = self.book.lookup(go, piece_type)
+        if move is None or move == "PASS" or go.valid_place_check(move[0], move[1], piece_type, test_check=True):
+            return move
+        return None
+
+    def endgame_move(self, go, piece_type, time_limit):
+        '''
+        快到终局的时候精确求解；能赢（或者和）就按它下，输定了、或者没算完，就还是用启发式搜索
+        Solve the end of the game exactly once few moves or empty points are left.
+
+        :return: a winning or drawing move, or None to fall back to the heuristic search.
+        '''
+        root = go.clone()
+        root.n_move = move_index(go, piece_type)
+        if root.max_move - root.n_move > ENDGAME_MOVES and empty_count(go) > ENDGAME_EMPTY:
+            return None
+        passes = 1 if opponent_passed(go) else 0
+        try:
+            move, result = self.endgame_solver.solve(root, piece_type, passes, time_limit)
+        except SolverTimeout:
+            return None
+        # A lost game is left to the heuristic search, which at least keeps the score close
+        if result == LOSS:
+            return None
+        return move
+
+    def lookahead_scores(self, go, piece_type):
+        '''
+        一步看：所有能下的点一次下完、一次算特征（NumPy），特征矩阵乘 move_bonus 的权重
+        One-ply lookahead: the move_bonus of every legal move, all children scored at once with
+        one matrix product.
+
+        :return: a dict from the point i * n + j of every legal move to its score, or None without NumPy.
+        '''
+        if np is None:
+            return None
+        points, _, captured, vectors = child_features(go, piece_type)
+        factor = 8 if piece_type == 1 else 3
+        scores = vectors @ np.array(BONUS_WEIGHTS) + factor * captured
+        return dict(zip(points.tolist(), scores.tolist()))
+
+    def lookahead_move(self, go, piece_type):
+        '''
+        一步看里分最高的一手
+        The legal move with the best one-ply lookahead score.
+
+        :return: (row, column), or None when there is no legal move.
+        '''
+        scores = self.lookahead_scores(go, piece_type)
+        if scores is None:
+            # No NumPy: the first legal move, which still beats losing on time
+            legal_moves = go.legal_moves(piece_type)
+            return (legal_moves[0].i, legal_moves[0].j) if legal_moves else None
+        if not scores:
+            return None
+        return divmod(max(scores, key=scores.get), go.size)
+
+    def choose_move(self, go, piece_type):
+        '''
+        开局库 -> 残局求解 -> 迭代加深搜索
+        Pick the move: opening book, then the endgame solver, then the iterative deepening search.
+
+        :return: (move, source) with source 'book', 'endgame' or 'search'.
+        '''
+        next_move = self.book_move(go, piece_type)
+        if next_move is not None:
+            self.completed_depth = 0
+            return next_move, 'book'
+        start = time.time()
+        next_move = self.endgame_move(go, piece_type, self.time_limit * ENDGAME_TIME_SHARE)
+        if next_move is not None:
+            self.completed_depth = 0
+            return next_move, 'endgame'
+        self.deadline = start + self.time_limit
+        self.transposition_table.new_search()
+        try:
+            if self.workers > 1:
+                self.shared_alpha = multiprocessing.Value('d', -math.inf)
+                with multiprocessing.Pool(self.workers, _init_worker, (self.shared_alpha, self.max_depth)) as pool:
+                    self.pool = pool
+                    next_move = self.iterative_deepening(go, piece_type)
+            else:
+                next_move = self.iterative_deepening(go, piece_type)
+        finally:
+            self.deadline = None
+            self.pool = None
+        if next_move is None and self.completed_depth == 0:
+            # Not even depth 1 finished: the best move one ply ahead beats losing on time
+            next_move = self.lookahead_move(go, piece_type)
+        if next_move is None:
+            next_move = "PASS"
+        return next_move, 'search'
 
-                if beta <= alpha:
-                    break
+    def get_input(self, go, piece_type):
+        if self.stats is None:
+            return self.choose_move(go, piece_type)[0]
+        self.stats.start_move(self.transposition_table, self.evaluation_cache)
+        next_move, source = self.choose_move(go, piece_type)
+        self.stats.write(piece_type, next_move, source, self.completed_depth, self.transposition_table,
+                         self.evaluation_cache)
+        return next_move
 
-        self.transposition_table[board_hash] = (max_eval, depth)
 
-        return best_move, max_eval
+_worker = None
+
+
+def _init_worker(shared_alpha, max_depth):
+    '''
+    进程池里每个进程一个自己的 player（自己的置换表和历史表）
+    Set up the player of a pool process; it keeps its own tables across root moves.
+    '''
+    global _worker
+    _worker = MinMaxPlayer(time_limit=math.inf, max_depth=max_depth)
+    _worker.shared_alpha = shared_alpha
 
-    def get_input(self, go, piece_type):
-        next_move, _ = self.min_max_ab_pruning(go, 0, piece_type, -math.inf, math.inf, 1)
-        if next_move is None:
-            next_move = "PASS"
-        return next_move
+
+def _search_root_move(task):
+    '''
+    进程池的任务：搜根节点的一手，时间到了返回 None
+    Pool task: (move, value or None on timeout, nodes searched).
+    '''
+    go, piece_type, move, search_depth, deadline = task
+    _worker.search_depth = search_depth
+    _worker.deadline = deadline
+    _worker.nodes = 0
+    try:
+        value = _worker.search_root_move(go, piece_type, move)
+    except SearchTimeout:
+        value = None
+    return move, value, _worker.nodes
 
 
 if __name__ == "__main__":
@@ -305,8 +608,17 @@ if __name__ == "__main__":
         piece_type, previous_board, board = 1, None, None
     go = GO(n)
     go.set_board(piece_type, previous_board, board)
-    player = MinMaxPlayer()
-    action = player.get_input(go, piece_type)
-    writeOutput(action)
+    # The input has no move index: the clock carries it (and the game's time) from one move to the next
+    start = time.time()
+    clock = MoveClock(CLOCK_PATH.format(piece_type), max_move_time=TIME_LIMIT)
+    clock.start(go, piece_type)
+    player = MinMaxPlayer(time_limit=clock.budget(go, piece_type), table_path=TABLE_PATH.format(piece_type),
+                          workers=WORKERS, book_path=BOOK_PATH, stats_path=STATS_PATH)
+    try:
+        action = player.get_input(go, piece_type)
+        writeOutput(action)
+    finally:
+        player.close()
+    clock.finish(go, piece_type, action, time.time() - start)
 
 
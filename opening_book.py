@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: opening_book
+# Description: 开局库：离线把前几手的局面都深搜一遍，最佳应手存成二进制文件，下棋时查表直接出棋
+#              python opening_book.py --plies 6 --time 20
+# TodoList:
+
+import argparse
+import os
+import struct
+import time
+from array import array
+
+from host import GO, ZOBRIST_SEED
+from symmetry import restore_move, transform_move
+
+BOOK_PATH = 'opening_book.bin'
+MAGIC = b'HW2BOOK\x00'
+FORMAT_VERSION = 2  # bump whenever the key or the evaluation the moves were searched with changes
+HEADER = struct.Struct('<8sIIQ')  # magic, version, entries, key tag
+PASS = -1
+
+
+class OpeningBook:
+    def __init__(self, size=5):
+        '''
+        开局库：canonical_key -> 对称归一化以后的最佳应手
+        Opening book from canonical position keys (GO.canonical_key) to best replies stored in the
+        canonical frame, so one entry serves all 8 symmetric positions.
+
+        :param size: width and height of the board.
+        '''
+        self.size = size
+        self.key_tag = ZOBRIST_SEED * 100 + size
+        self.moves = {}
+
+    def __len__(self):
+        return len(self.moves)
+
+    @classmethod
+    def load(cls, path=BOOK_PATH, size=5):
+        '''
+        读开局库；文件没有、版本不对、不是这种棋盘的，都返回空的开局库
+        Load a book written by save(). A missing or unusable file gives an empty book.
+        '''
+        book = cls(size)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return book
+        if len(data) < HEADER.size:
+            return book
+        magic, version, count, key_tag = HEADER.unpack_from(data, 0)
+        if (magic != MAGIC or version != FORMAT_VERSION or key_tag != book.key_tag
+                or len(data) != HEADER.size + count * 9):
+            return book
+        keys = array('Q')
+        keys.frombytes(data[HEADER.size:HEADER.size + count * 8])
+        moves = array('b')
+        moves.frombytes(data[HEADER.size + count * 8:])
+        book.moves = dict(zip(keys, moves))
+        return book
+
+    def save(self, path=BOOK_PATH):
+        '''
+        存成二进制：文件头 + 排好序的 8 字节 key + 每个 1 字节的走法（i * n + j，PASS 是 -1）
+        Write the book: a header, the sorted 64-bit keys, then one signed byte per move.
+        '''
+        keys = array('Q', sorted(self.moves))
+        moves = array('b', [self.moves[key] for key in keys])
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(keys), self.key_tag))
+            f.write(keys.tobytes())
+            f.write(moves.tobytes())
+
+    def add(self, go, piece_type, move):
+        key, t = go.canonical_key(piece_type)
+        if move == "PASS" or move is None:
+            self.moves[key] = PASS
+        else:
+            i, j = transform_move(move, t, self.size)
+            self.moves[key] = i * self.size + j
+
+    def lookup(self, go, piece_type):
+        '''
+        查开局库，O(1)
+        Book reply of piece_type in this position.
+
+        :return: (row, column), "PASS", or None when the position is not in the book.
+        '''
+        key, t = go.canonical_key(piece_type)
+        move = self.moves.get(key)
+        if move is None:
+            return None
+        if move == PASS:
+            return "PASS"
+        return restore_move(divmod(move, self.size), t, self.size)
+
+
+def build_book(plies, time_limit, max_depth, size=5, book=None, path=None, verbose=True):
+    '''
+    对两种颜色分别建库：轮到自己下的局面深搜一手存起来，只沿着这一手往下走；轮到对手的局面把所有应手都展开
+    对称的局面只算一次
+    Build the book of the first plies for both colors. Where the book side is to move the
+    position is searched and only the book move is followed; where the opponent is to move
+    every legal reply is followed. Symmetric positions are searched once.
+
+    :param plies: positions with fewer than plies moves played are covered.
+    :param time_limit: search time of one position, in seconds.
+    :param max_depth: deepest iteration of the search of one position.
+    :param book: an OpeningBook to extend, so a build can be resumed.
+    :param path: if given, the book is saved there after every ply.
+    :return: the book.
+    '''
+    from my_player3 import MinMaxPlayer
+
+    if book is None:
+        book = OpeningBook(size)
+    start = time.time()
+    for book_side in (1, 2):
+        seen = set()
+        frontier = [GO(size)]
+        frontier[0].init_board(size)
+        for ply in range(plies):
+            piece_type = 1 if ply % 2 == 0 else 2
+            following = []
+            for go in frontier:
+                key = go.canonical_key(piece_type)[0]
+                if key in seen:
+                    continue
+                seen.add(key)
+                if piece_type == book_side:
+                    move = book.lookup(go, piece_type)
+                    if move is None:
+                        player = MinMaxPlayer(time_limit=time_limit, max_depth=max_depth)
+                        move = player.get_input(go, piece_type)
+                        book.add(go, piece_type, move)
+                    replies = [] if move == "PASS" else [move]
+                else:
+                    replies = [(move.i, move.j) for move in go.legal_moves(piece_type)]
+                for i, j in replies:
+                    child = go.clone()
+                    child.play(i, j, piece_type)
+                    following.append(child)
+            frontier = following
+            if path is not None:
+                book.save(path)
+            if verbose:
+                print('side {} ply {}: {} entries, {:.0f}s'.format(book_side, ply, len(book), time.time() - start))
+    return book
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plies", "-p", type=int, help="cover the positions of the first plies", default=6)
+    parser.add_argument("--time", "-t", type=float, help="search time of one position in seconds", default=20.0)
+    parser.add_argument("--depth", "-d", type=int, help="deepest iteration of the search of one position", default=24)
+    parser.add_argument("--output", "-o", type=str, help="book file", default=BOOK_PATH)
+    args = parser.parse_args()
+
+    # Extend an existing book, so an interrupted build can be resumed with the same command
+    book = OpeningBook.load(args.output) if os.path.exists(args.output) else None
+    book = build_book(args.plies, args.time, args.depth, book=book, path=args.output)
+    print('{} entries written to {}'.format(len(book), args.output))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: patterns
+# Description: 棋形编译成查找表：一个点周围的窗口（每格 空/黑/白/棋盘外 四种，2 位）编码成一个整数，
+#              查一次表就知道哪些棋形对上了；落子/提子的时候只改碰到这个点的那几个窗口
+# TodoList:
+
+from array import array
+
+EMPTY = 0
+EDGE = 3  # a cell of the window that is off the board; 1 and 2 are the stones
+
+CROSS = ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1))  # a point and its four neighbors
+ROW = ((0, 0), (0, 1), (0, 2), (0, 3), (0, 4))  # five points to the right along a row
+# Five points along a line in each of the four directions: a shape over these is the same under the 8 board symmetries
+LINES = (ROW, tuple((di, -dj) for di, dj in ROW), tuple((dj, di) for di, dj in ROW), tuple((-dj, di) for di, dj in ROW))
+
+# One character per cell of the window, for the color the pattern is matched for:
+# 'X' own stone, 'O' opponent stone, '.' empty, '#' off the board, 'x' own stone or off the board,
+# '?' any point on the board, '*' anything
+_CELLS = {
+    'X': lambda own: (own,),
+    'O': lambda own: (3 - own,),
+    '.': lambda own: (EMPTY,),
+    '#': lambda own: (EDGE,),
+    'x': lambda own: (own, EDGE),
+    '?': lambda own: (EMPTY, 1, 2),
+    '*': lambda own: (EMPTY, 1, 2, EDGE),
+}
+
+
+class PatternTable:
+    def __init__(self, window, patterns, size=5):
+        '''
+        把一组同一个窗口的棋形编译成查找表：下标是窗口的编码，值是对上的棋形（两种颜色）的位
+        Compile patterns over one window into a lookup table. A window is encoded as the sum of
+        state * 4 ** k over its cells k, and hits[code] has bit 2 * m + color - 1 set when pattern m
+        matches for color.
+
+        :param window: (row, column) offsets of the cells from the anchor point.
+        :param patterns: strings with one character per cell of the window (see _CELLS).
+        :param size: width and height of the board.
+        '''
+        self.window = window
+        self.patterns = patterns
+        self.size = size
+        allowed = [[[_CELLS[char](own) for char in pattern] for pattern in patterns] for own in (1, 2)]
+        self.hits = array('I', bytes(4 * 4 ** len(window)))
+        for code in range(4 ** len(window)):
+            states = [code >> (2 * k) & 3 for k in range(len(window))]
+            hits = 0
+            for m in range(len(patterns)):
+                for own in (1, 2):
+                    if all(state in cells for state, cells in zip(states, allowed[own - 1][m])):
+                        hits |= 1 << (2 * m + own - 1)
+            self.hits[code] = hits
+
+        # The cells of every anchor on the board, and the constant part of its code: the cells off the board
+        n = size
+        self.cells = []
+        self.edge_codes = []
+        self.touching = [[] for _ in range(n * n)]  # touching[q]: (anchor, 4 ** k) of every window covering q
+        for i in range(n):
+            for j in range(n):
+                cells = []
+                edge_code = 0
+                for k, (di, dj) in enumerate(window):
+                    if 0 <= i + di < n and 0 <= j + dj < n:
+                        q = (i + di) * n + j + dj
+                        cells.append((q, 4 ** k))
+                        self.touching[q].append((i * n + j, 4 ** k))
+                    else:
+                        edge_code += EDGE * 4 ** k
+                self.cells.append(cells)
+                self.edge_codes.append(edge_code)
+
+    def codes(self, black, white):
+        '''
+        从头算每个点的窗口编码
+        The window code of every anchor point of the board given by the black and white bitboards.
+        '''
+        codes = []
+        for cells, code in zip(self.cells, self.edge_codes):
+            for q, weight in cells:
+                if black >> q & 1:
+                    code += weight
+                elif white >> q & 1:
+                    code += 2 * weight
+            codes.append(code)
+        return codes
+
+
+class PatternBoard:
+    def __init__(self, table, black=0, white=0):
+        '''
+        一个棋盘上每个点的窗口编码和对上的棋形的个数，落子/提子的时候增量更新
+        Window codes of every point of one board and the number of hits of every pattern, kept up
+        to date point by point.
+
+        :param table: a PatternTable.
+        :param black: bitboard of the black stones.
+        :param white: bitboard of the white stones.
+        '''
+        self.table = table
+        self.codes = table.codes(black, white)
+        self.counts = [0] * (2 * len(table.patterns))  # counts[2 * m + color - 1]: hits of pattern m for color
+        hits = table.hits
+        for code in self.codes:
+            found = hits[code]
+            while found:
+                low = found & -found
+                self.counts[low.bit_length() - 1] += 1
+                found ^= low
+
+    def _change(self, q, delta):
+        hits = self.table.hits
+        codes = self.codes
+        counts = self.counts
+        for anchor, weight in self.table.touching[q]:
+            code = codes[anchor]
+            before = hits[code]
+            code += delta * weight
+            codes[anchor] = code
+            changed = before ^ hits[code]
+            while changed:
+                low = changed & -changed
+                counts[low.bit_length() - 1] += 1 if hits[code] & low else -1
+                changed ^= low
+
+    def place(self, q, color):
+        '''
+        空点 q 上放了一个 color 的子
+        A stone of color was put on the empty point q.
+        '''
+        self._change(q, color)
+
+    def remove(self, q, color):
+        '''
+        q 上 color 的子被拿掉了
+        The stone of color on q was removed.
+        '''
+        self._change(q, -color)
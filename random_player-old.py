@@ -18,11 +18,7 @@ class RandomPlayer():
         :param piece_type: 1('X') or 2('O').
         :return: (row, column) coordinate of input.
         '''
-        possible_placements = []
-        for i in range(go.size):
-            for j in range(go.size):
-                if go.valid_place_check(i, j, piece_type, test_check=True):
-                    possible_placements.append((i, j))
+        possible_placements = [(move.i, move.j) for move in go.legal_moves(piece_type)]
 
         if not possible_placements:
             return "PASS"
@@ -37,11 +33,7 @@ class RandomPlayer():
         :param piece_type: 1('X') or 2('O').
         :return: (row, column) coordinate of input.
         '''
-        possible_placements = []
-        for i in range(go.size):
-            for j in range(go.size):
-                if go.valid_place_check(i, j, piece_type, test_check=True):
-                    possible_placements.append((i, j))
+        possible_placements = [(move.i, move.j) for move in go.legal_moves(piece_type)]
 
         if not possible_placements:
             return "PASS"
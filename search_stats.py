@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: search_stats
+# Description: 搜索的统计（每层结点数、叶子估值次数、valid_place_check 次数、置换表、剪枝位置、有效分支因子、每次迭代的时间），
+#              每一手写一行 JSON；不开的时候搜索里只多几个 is None 判断
+# TodoList:
+
+import json
+import time
+
+from host import GO
+
+
+class CountingGO(GO):
+    '''
+    数一下 valid_place_check 和 legal_moves 被调了几次的 GO
+    GO that counts its legality checks; clones stay CountingGO.
+    '''
+    __slots__ = ()
+    valid_place_checks = 0
+    legal_moves_calls = 0
+
+    @classmethod
+    def wrap(cls, go):
+        '''
+        复制一份 go 换成 CountingGO
+        A counting copy of go.
+        '''
+        counting = go.clone()
+        counting.__class__ = cls
+        return counting
+
+    def valid_place_check(self, i, j, piece_type, test_check=False):
+        CountingGO.valid_place_checks += 1
+        return GO.valid_place_check(self, i, j, piece_type, test_check)
+
+    def legal_moves(self, piece_type):
+        CountingGO.legal_moves_calls += 1
+        return GO.legal_moves(self, piece_type)
+
+
+class SearchStats:
+    def __init__(self, path):
+        '''
+        一手棋的搜索统计，get_input 结束的时候追加一行 JSON 到 path
+        Statistics of the search of one move, appended to path as one JSON line per move.
+
+        :param path: the stats file.
+        '''
+        self.path = path
+        self.table_counts = (0, 0, 0)
+        self.cache_counts = (0, 0, 0)
+        self.start_move(None)
+
+    def start_move(self, table, cache=None):
+        '''
+        新的一手：计数清零，记下置换表和估值缓存现在的计数（它们跨手累计）
+        Reset the counters; table is the TranspositionTable and cache the EvaluationCache, whose
+        counters run across moves.
+        '''
+        self.start = time.time()
+        if table is not None:
+            self.table_counts = (table.probes, table.hits, table.stores)
+        if cache is not None:
+            self.cache_counts = (cache.hits, cache.misses, cache.evictions)
+        self.nodes_per_ply = []
+        self.evaluations = 0
+        self.cutoffs = []  # cutoffs[k]: beta cutoffs caused by the k-th move tried at a node
+        self.iterations = []
+        self.iteration_start = None
+        CountingGO.valid_place_checks = 0
+        CountingGO.legal_moves_calls = 0
+
+    def node(self, depth):
+        while len(self.nodes_per_ply) <= depth:
+            self.nodes_per_ply.append(0)
+        self.nodes_per_ply[depth] += 1
+
+    def evaluation(self):
+        self.evaluations += 1
+
+    def cutoff(self, index):
+        while len(self.cutoffs) <= index:
+            self.cutoffs.append(0)
+        self.cutoffs[index] += 1
+
+    def start_iteration(self):
+        self.iteration_start = time.time()
+
+    def end_iteration(self, depth, nodes, completed):
+        self.iterations.append({'depth': depth, 'nodes': nodes, 'completed': completed,
+                                'seconds': round(time.time() - self.iteration_start, 6)})
+
+    def effective_branching_factor(self):
+        '''
+        有效分支因子：最后两次搜完的迭代的结点数之比
+        Node ratio of the last two completed iterations.
+        '''
+        completed = [iteration['nodes'] for iteration in self.iterations if iteration['completed']]
+        if len(completed) < 2 or not completed[-2]:
+            return None
+        return round(completed[-1] / completed[-2], 3)
+
+    def write(self, piece_type, move, source, completed_depth, table, cache=None):
+        '''
+        追加一行 JSON
+        Append the statistics of this move to the stats file.
+
+        :param source: where the move came from: 'book', 'endgame' or 'search'.
+        :param table: the TranspositionTable of the search.
+        :param cache: the EvaluationCache of the search, if any.
+        '''
+        record = {
+            'piece_type': piece_type,
+            'move': move,
+            'source': source,
+            'seconds': round(time.time() - self.start, 6),
+            'completed_depth': completed_depth,
+            'nodes_per_ply': self.nodes_per_ply[1:],
+            'evaluations': self.evaluations,
+            'valid_place_checks': CountingGO.valid_place_checks,
+            'legal_moves_calls': CountingGO.legal_moves_calls,
+            'tt': {'probes': table.probes - self.table_counts[0], 'hits': table.hits - self.table_counts[1],
+                   'stores': table.stores - self.table_counts[2]},
+            'cutoff_index': self.cutoffs,
+            'eval_cache': None if cache is None else {
+                'hits': cache.hits - self.cache_counts[0], 'misses': cache.misses - self.cache_counts[1],
+                'evictions': cache.evictions - self.cache_counts[2], 'entries': len(cache)},
+            'effective_branching_factor': self.effective_branching_factor(),
+            'iterations': self.iterations,
+        }
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
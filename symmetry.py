@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: symmetry
+# Description: 棋盘的 8 种对称（翻转 + 转置），用来把对称的局面映射到同一个 key 上
+# TodoList:
+
+SYMMETRY_COUNT = 8
+
+_TRANSFORMS = {}
+
+
+def map_point(i, j, t, n):
+    '''
+    把 (i, j) 按第 t 种对称变过去：t & 1 上下翻，t & 2 左右翻，t & 4 再转置
+    Map a point through symmetry t of an n*n board.
+
+    :param i: row number of the board.
+    :param j: column number of the board.
+    :param t: symmetry index in range(8), 0 is the identity.
+    :param n: width and height of the board.
+    :return: the transformed (row, column).
+    '''
+    if t & 1:
+        i = n - 1 - i
+    if t & 2:
+        j = n - 1 - j
+    if t & 4:
+        i, j = j, i
+    return i, j
+
+
+def point_transforms(n):
+    '''
+    每种对称下每个点变到哪里：transforms[t][p]，p = i * n + j
+    Point permutations of the 8 symmetries of an n*n board.
+
+    :param n: width and height of the board.
+    :return: a list of 8 lists where transforms[t][p] is the image of point p under symmetry t.
+    '''
+    transforms = _TRANSFORMS.get(n)
+    if transforms is None:
+        transforms = []
+        for t in range(SYMMETRY_COUNT):
+            perm = []
+            for i in range(n):
+                for j in range(n):
+                    x, y = map_point(i, j, t, n)
+                    perm.append(x * n + y)
+            transforms.append(perm)
+        _TRANSFORMS[n] = transforms
+    return transforms
+
+
+def inverse(t):
+    '''
+    第 t 种对称的逆：不转置的自己就是逆，转置的要把两个翻转对调
+    Index of the symmetry that undoes symmetry t.
+    '''
+    if t & 4:
+        return 4 | ((t & 1) << 1) | ((t & 2) >> 1)
+    return t
+
+
+def transform_move(move, t, n):
+    '''
+    把原局面里的一手棋变到对称后的局面里（PASS 不变）
+    Map a move of the original board into the frame of symmetry t.
+
+    :param move: (row, column) or "PASS".
+    :param t: symmetry index.
+    :param n: width and height of the board.
+    :return: the transformed move.
+    '''
+    if move is None or move == "PASS":
+        return move
+    return map_point(move[0], move[1], t, n)
+
+
+def restore_move(move, t, n):
+    '''
+    把对称后局面里的一手棋变回原局面（transform_move 的逆）
+    Map a move stored in the frame of symmetry t back to the original board.
+
+    :param move: (row, column) or "PASS".
+    :param t: symmetry index.
+    :param n: width and height of the board.
+    :return: the move on the original board.
+    '''
+    return transform_move(move, inverse(t), n)
+
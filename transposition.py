@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# ProjectName: HW2
+# FileName: transposition
+# Description: 定长的置换表：每个桶两格（深度优先 + 总是替换），存值的类型（精确 / 下界 / 上界）和最佳走法；
+#              可以放在 mmap 的文件里，每一手都是新进程也能接着用
+# TodoList:
+
+import mmap
+import os
+import struct
+import zlib
+
+EMPTY = 0  # a free slot; a zero-filled buffer is an empty table
+EXACT = 1  # the value is the minimax value of the position
+LOWER = 2  # the search failed high: the true value is at least the stored value
+UPPER = 3  # the search failed low: the true value is at most the stored value
+
+NO_MOVE = -1
+
+MAGIC = b'HW2TT\x00\x00\x00'
+FORMAT_VERSION = 3  # bump whenever the layout or the meaning of the stored values changes
+HEADER = struct.Struct('<8sIIQQII')  # magic, version, slots, key tag, generation, clean, crc32 of the entries
+HEADER_BYTES = 64
+# (format, bytes per slot) of every field, widest first so every field stays aligned
+FIELDS = (('keys', 'Q', 8), ('values', 'd', 8), ('ages', 'H', 2), ('depths', 'b', 1), ('flags', 'b', 1),
+          ('moves', 'b', 1))
+ENTRY_BYTES = sum(width for _, _, width in FIELDS)
+
+
+def _slot_count(capacity):
+    '''
+    桶数取 2 的幂，每个桶两格
+    Number of slots for a capacity: a power of two number of buckets of two slots.
+    '''
+    buckets = 1
+    while buckets * 2 < capacity:
+        buckets *= 2
+    return buckets * 2
+
+
+class TranspositionTable:
+    def __init__(self, capacity=1 << 16):
+        '''
+        固定大小的置换表，内存不会越用越多
+        Fixed-capacity transposition table. Every bucket has a depth-preferred slot and an
+        always-replace slot, and every field is a typed view of one flat buffer, so the memory is
+        capped at ENTRY_BYTES per entry.
+
+        :param capacity: number of entries, rounded up to an even power of two.
+        '''
+        size = _slot_count(capacity)
+        self._attach(bytearray(size * ENTRY_BYTES), size)
+        self.generation = 0
+        self.path = None
+        self.key_tag = 0
+        self._file = None
+        self._map = None
+
+    @classmethod
+    def open(cls, path, capacity=1 << 16, key_tag=0):
+        '''
+        打开（没有就新建）一个放在文件里的置换表，文件头不对、版本不对、上次没正常关、校验和不对，都当成空表
+        Open a transposition table backed by a memory-mapped file. A missing file, another format
+        version, other keys (key_tag), another capacity, a file left open by a crashed process or
+        a checksum mismatch all start an empty table in its place.
+
+        :param path: file of the table.
+        :param capacity: number of entries.
+        :param key_tag: identifies how the keys were made (Zobrist seed and board size).
+        :return: the table; call close() to write it back.
+        '''
+        size = _slot_count(capacity)
+        length = HEADER_BYTES + size * ENTRY_BYTES
+        table = cls.__new__(cls)
+        table.path = path
+        table.key_tag = key_tag
+        table._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        try:
+            table._file.seek(0, os.SEEK_END)
+            valid = table._file.tell() == length
+            if not valid:
+                table._file.truncate(length)
+            table._map = mmap.mmap(table._file.fileno(), length)
+        except (OSError, ValueError):
+            table._file.close()
+            raise
+        table._attach(memoryview(table._map)[HEADER_BYTES:], size)
+
+        magic, version, slots, tag, generation, clean, checksum = HEADER.unpack_from(table._map, 0)
+        valid = (valid and magic == MAGIC and version == FORMAT_VERSION and slots == size and tag == key_tag
+                 and clean == 1 and checksum == zlib.crc32(table._entries))
+        if not valid:
+            table.clear()
+            generation = 0
+        table.generation = generation
+        # Marked dirty until close(): a process killed in the middle leaves a table that is thrown away
+        table._write_header(clean=0, checksum=0)
+        table._map.flush()
+        return table
+
+    def _attach(self, buffer, size):
+        self._entries = memoryview(buffer)
+        self._views = []
+        offset = 0
+        for name, code, width in FIELDS:
+            view = self._entries[offset:offset + size * width].cast(code)
+            setattr(self, name, view)
+            self._views.append(view)
+            offset += size * width
+        self.mask = size // 2 - 1
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def _write_header(self, clean, checksum):
+        HEADER.pack_into(self._map, 0, MAGIC, FORMAT_VERSION, len(self.keys), self.key_tag,
+                         self.generation, clean, checksum)
+
+    def close(self):
+        '''
+        写回文件：算校验和，标记成正常关闭（只在内存里的表什么也不做）
+        Write a file-backed table back with its checksum and mark it cleanly closed.
+        '''
+        if self._map is None:
+            return
+        self._write_header(clean=1, checksum=zlib.crc32(self._entries))
+        self._map.flush()
+        for view in self._views:
+            view.release()
+        self._entries.release()
+        self._map.close()
+        self._file.close()
+        self._map = None
+        self._file = None
+
+    def __len__(self):
+        return sum(1 for flag in self.flags if flag != EMPTY)
+
+    def new_search(self):
+        '''
+        开始新的一手：之前存的深度优先格可以被更浅的结果顶掉
+        Start a new move: entries of older searches lose their claim on the depth-preferred slots.
+        '''
+        self.generation = (self.generation + 1) & 0xFFFF
+
+    def clear(self):
+        self._entries[:] = bytes(len(self._entries))
+
+    def _find(self, key):
+        slot = (key & self.mask) * 2
+        if self.keys[slot] == key and self.flags[slot] != EMPTY:
+            return slot
+        slot += 1
+        if self.keys[slot] == key and self.flags[slot] != EMPTY:
+            return slot
+        return -1
+
+    def probe(self, key):
+        '''
+        查表
+        Look a position up.
+
+        :param key: 64-bit Zobrist key, including the side to move and the KO point.
+        :return: (value, depth, flag, move) or None when the position is not stored.
+        '''
+        self.probes += 1
+        slot = self._find(key)
+        if slot < 0:
+            return None
+        self.hits += 1
+        return self.values[slot], self.depths[slot], self.flags[slot], self.moves[slot]
+
+    def store(self, key, value, depth, flag, move=NO_MOVE):
+        '''
+        存一个结果：深度更深、同一个局面、或者旧搜索留下的才能占深度优先格，否则放进总是替换格
+        Save a search result. It takes the depth-preferred slot of its bucket when it is at least
+        as deep as the entry there, is the same position or that entry is from an older search;
+        otherwise it overwrites the always-replace slot.
+
+        :param key: 64-bit Zobrist key.
+        :param value: the search value.
+        :param depth: remaining depth the value was searched to, 0 to 127.
+        :param flag: EXACT, LOWER or UPPER.
+        :param move: best move as a small non-negative integer, or NO_MOVE.
+        '''
+        self.stores += 1
+        slot = (key & self.mask) * 2
+        preferred = (self.flags[slot] == EMPTY or self.keys[slot] == key or depth >= self.depths[slot]
+                     or self.ages[slot] != self.generation)
+        if self.keys[slot + 1] == key and self.flags[slot + 1] != EMPTY:
+            # Keep a position in one slot only
+            if preferred:
+                self.flags[slot + 1] = EMPTY
+            else:
+                slot += 1
+        elif not preferred:
+            slot += 1
+        if move == NO_MOVE and self.keys[slot] == key and self.flags[slot] != EMPTY:
+            # A fail-low result has no best move; keep the one found before
+            move = self.moves[slot]
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.ages[slot] = self.generation